@@ -0,0 +1,187 @@
+"""Admission control for automated removal work.
+
+Removal jobs are queued in priority lanes instead of starting a browser
+session per request. Each lane is bounded; when a lane is full the API
+answers 429 with a Retry-After hint. Workers pick the next job with smooth
+weighted round-robin across non-empty lanes so first-time removals keep
+moving while retries and periodic re-scans are backed up. A user is queued
+at most once: submitting a user who is already queued is a no-op, and one
+who is running is queued once more when the current job finishes, so
+concurrent workers never process the same user's brokers side by side.
+"""
+import asyncio
+import logging
+import os
+from collections import deque
+from typing import Any, Awaitable, Callable, Deque, Dict, List, Optional, Set
+
+logger = logging.getLogger(__name__)
+
+FIRST_TIME = "first_time"
+RETRY = "retry"
+RESCAN = "rescan"
+
+DEFAULT_LANE_WEIGHTS = {
+    FIRST_TIME: 5,
+    RETRY: 2,
+    RESCAN: 1,
+}
+
+
+class QueueFull(Exception):
+    """Raised when a lane has no room for another job"""
+
+    def __init__(self, lane: str, retry_after: int):
+        super().__init__(f"Removal queue lane '{lane}' is full")
+        self.lane = lane
+        self.retry_after = retry_after
+
+
+class RemovalQueue:
+    """Bounded, weighted-fair queue of removal jobs keyed by user id"""
+
+    def __init__(
+        self,
+        handler: Callable[[str], Awaitable[None]],
+        capacity: int = 100,
+        workers: int = 1,
+        weights: Optional[Dict[str, int]] = None,
+        retry_after: int = 60,
+    ):
+        self.handler = handler
+        self.capacity = capacity
+        self.workers = workers
+        self.weights = dict(weights or DEFAULT_LANE_WEIGHTS)
+        self.retry_after = retry_after
+        self.lanes: Dict[str, Deque[str]] = {lane: deque() for lane in self.weights}
+        self.reserved: Dict[str, int] = {lane: 0 for lane in self.weights}
+        self.current_weights: Dict[str, int] = {lane: 0 for lane in self.weights}
+        self.available = asyncio.Semaphore(0)
+        self.tasks: List[asyncio.Task] = []
+        # Users waiting in a lane, and running users mapped to the lane of a follow-up run
+        self.queued: Set[str] = set()
+        self.running: Dict[str, Optional[str]] = {}
+
+    def reserve(self, lane: str) -> None:
+        """Claim a slot in a lane before doing the work the job depends on"""
+        if lane not in self.lanes:
+            raise ValueError(f"Unknown removal lane: {lane}")
+        if len(self.lanes[lane]) + self.reserved[lane] >= self.capacity:
+            raise QueueFull(lane, self.retry_after)
+        self.reserved[lane] += 1
+
+    def release(self, lane: str) -> None:
+        """Give back a reserved slot that will not be submitted"""
+        self.reserved[lane] -= 1
+
+    def submit(self, lane: str, user_id: str) -> bool:
+        """Queue a job into a slot previously claimed with reserve(), returning whether it was added"""
+        self.reserved[lane] -= 1
+        return self.requeue(lane, user_id)
+
+    def requeue(self, lane: str, user_id: str) -> bool:
+        """Queue a job without admission control, returning False if the user already has one"""
+        if user_id in self.queued:
+            # The queued job picks up all of the user's pending requests when it runs
+            return False
+        if user_id in self.running:
+            # The running job may have read its pending requests already; run once more afterwards
+            self.running[user_id] = self.running[user_id] or lane
+            return False
+        self.queued.add(user_id)
+        self.lanes[lane].append(user_id)
+        self.available.release()
+        return True
+
+    def depth(self) -> Dict[str, int]:
+        return {lane: len(jobs) + self.reserved[lane] for lane, jobs in self.lanes.items()}
+
+    def _next_job(self) -> str:
+        """Pick the next job using smooth weighted round-robin over non-empty lanes"""
+        ready = [lane for lane, jobs in self.lanes.items() if jobs]
+        total = sum(self.weights[lane] for lane in ready)
+        for lane in ready:
+            self.current_weights[lane] += self.weights[lane]
+        chosen = max(ready, key=lambda lane: self.current_weights[lane])
+        self.current_weights[chosen] -= total
+        return self.lanes[chosen].popleft()
+
+    async def _worker(self) -> None:
+        while True:
+            await self.available.acquire()
+            user_id = self._next_job()
+            self.queued.discard(user_id)
+            self.running[user_id] = None
+            try:
+                await self.handler(user_id)
+            except Exception as e:
+                logger.error("Removal job for user %s failed: %s", user_id, e)
+            finally:
+                follow_up = self.running.pop(user_id)
+                if follow_up is not None:
+                    self.requeue(follow_up, user_id)
+
+    def start(self) -> None:
+        for _ in range(self.workers):
+            self.tasks.append(asyncio.create_task(self._worker()))
+
+    async def stop(self) -> None:
+        for task in self.tasks:
+            task.cancel()
+        await asyncio.gather(*self.tasks, return_exceptions=True)
+        self.tasks = []
+
+
+def request_lane(request: Dict[str, Any]) -> str:
+    """The lane a pending request was queued in, inferred from how it became pending"""
+    if request.get("rescan_of"):
+        return RESCAN
+    if request.get("queued_at"):
+        return RETRY
+    return FIRST_TIME
+
+
+async def recover_removals(storage, queue: RemovalQueue) -> int:
+    """Re-queue automated work lost when the process stopped, returning the number of users queued
+
+    Jobs only live in memory, so after a restart requests interrupted mid-run
+    are still in_progress and queued ones are still pending. Interrupted
+    requests go back to pending and every user with pending automated work
+    is queued again, in the highest-weighted lane any of their requests
+    was queued in.
+    """
+    reset = await storage.update_removal_requests(
+        {"removal_type": "automated", "status": "in_progress"},
+        {"status": "pending"}
+    )
+    lanes: Dict[str, List[str]] = {}
+    for request in await storage.match_removal_requests({"removal_type": "automated", "status": "pending"}):
+        lanes.setdefault(request["user_id"], []).append(request_lane(request))
+    for user_id, user_lanes in lanes.items():
+        queue.requeue(max(user_lanes, key=queue.weights.__getitem__), user_id)
+    if reset or lanes:
+        logger.info("Recovered %d interrupted removal requests and queued %d users", reset, len(lanes))
+    return len(lanes)
+
+
+def lane_weights_from_env() -> Dict[str, int]:
+    """Read lane weights from REMOVAL_LANE_WEIGHTS, e.g. 'first_time=5,retry=2,rescan=1'"""
+    weights = dict(DEFAULT_LANE_WEIGHTS)
+    raw = os.environ.get('REMOVAL_LANE_WEIGHTS', '')
+    for item in filter(None, (part.strip() for part in raw.split(","))):
+        lane, _, weight = item.partition("=")
+        if lane.strip() not in weights:
+            raise ValueError(f"Unknown removal lane: {lane}")
+        weights[lane.strip()] = max(1, int(weight))
+    return weights
+
+
+def create_removal_queue(handler: Callable[[str], Awaitable[None]]) -> RemovalQueue:
+    """Build the removal queue from environment settings"""
+    return RemovalQueue(
+        handler,
+        capacity=int(os.environ.get('REMOVAL_QUEUE_CAPACITY', '100')),
+        workers=int(os.environ.get('REMOVAL_WORKERS', '1')),
+        weights=lane_weights_from_env(),
+        retry_after=int(os.environ.get('REMOVAL_RETRY_AFTER', '60')),
+    )
@@ -0,0 +1,136 @@
+"""Per-broker browser storage state cache.
+
+Each broker visit used to start from an empty browser context and walk
+through cookie banners, geo prompts and bot-check warm-ups again. When a
+broker flow has loaded its removal page and dismissed any consent prompt,
+the Playwright storage state (cookies and localStorage) is checkpointed
+before any personal information is entered. The checkpoint is persisted
+only if the run succeeds, which also renews it, and is loaded into new
+contexts for the same broker until it expires. State that fails to parse,
+has expired, or was in use when a removal failed is dropped so the next
+run starts clean.
+"""
+import json
+import logging
+import os
+import time
+from pathlib import Path
+from typing import Any, Dict, Optional, Tuple
+
+logger = logging.getLogger(__name__)
+
+ROOT_DIR = Path(__file__).parent
+
+# Common cookie banner and consent buttons, tried in order
+CONSENT_SELECTORS = [
+    "#onetrust-accept-btn-handler",
+    "button#accept-cookies",
+    "button:has-text('Accept All')",
+    "button:has-text('Accept Cookies')",
+    "button:has-text('Accept')",
+    "button:has-text('I Agree')",
+    "button:has-text('Agree')",
+    "button:has-text('Got it')",
+]
+
+
+class BrowserStateCache:
+    """Stores one Playwright storage state file per broker"""
+
+    def __init__(self, directory: Path, ttl_seconds: int = 24 * 3600):
+        self.directory = Path(directory)
+        self.ttl_seconds = ttl_seconds
+        # State captured mid-run, keyed by browser context until the run finishes
+        self.checkpoints: Dict[Any, Dict[str, Any]] = {}
+
+    def path_for(self, broker: str) -> Path:
+        return self.directory / f"{broker}.json"
+
+    def load(self, broker: str) -> Optional[Dict[str, Any]]:
+        """Return the cached storage state for a broker, or None if missing or stale"""
+        path = self.path_for(broker)
+        try:
+            with open(path, encoding="utf-8") as f:
+                entry = json.load(f)
+            saved_at = float(entry["saved_at"])
+            state = entry["state"]
+            if not isinstance(state.get("cookies"), list) or not isinstance(state.get("origins"), list):
+                raise ValueError("malformed storage state")
+        except FileNotFoundError:
+            return None
+        except (OSError, ValueError, KeyError, TypeError, AttributeError) as e:
+            logger.warning("Discarding unreadable browser state for %s: %s", broker, e)
+            self.invalidate(broker)
+            return None
+
+        if time.time() - saved_at > self.ttl_seconds:
+            self.invalidate(broker)
+            return None
+        return state
+
+    def save(self, broker: str, state: Dict[str, Any]) -> None:
+        """Persist a broker's storage state atomically"""
+        self.directory.mkdir(mode=0o700, parents=True, exist_ok=True)
+        path = self.path_for(broker)
+        tmp_path = path.with_suffix(".tmp")
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            json.dump({"saved_at": time.time(), "state": state}, f)
+        os.chmod(tmp_path, 0o600)
+        os.replace(tmp_path, path)
+
+    def invalidate(self, broker: str) -> None:
+        try:
+            self.path_for(broker).unlink()
+        except FileNotFoundError:
+            pass
+        except OSError as e:
+            logger.warning("Could not remove browser state for %s: %s", broker, e)
+
+    async def open_context(self, browser, broker: str) -> Tuple[Any, bool]:
+        """Open a browser context for a broker, returning it and whether cached state was used"""
+        state = self.load(broker)
+        if state is not None:
+            return await browser.new_context(storage_state=state), True
+        return await browser.new_context(), False
+
+    async def checkpoint(self, page) -> None:
+        """Dismiss consent prompts and remember the page's state before any form is filled"""
+        await dismiss_consent(page)
+        try:
+            self.checkpoints[page.context] = await page.context.storage_state()
+        except Exception as e:
+            logger.warning("Could not capture browser state: %s", e)
+
+    def finish(self, context, broker: str, from_cache: bool, success: bool) -> None:
+        """Persist the checkpointed state after a successful run, or drop cached state after a failure"""
+        state = self.checkpoints.pop(context, None)
+        if success and state is not None:
+            try:
+                # Saving on every success also renews the TTL
+                self.save(broker, state)
+            except OSError as e:
+                # The cache is best effort and must never fail a removal
+                logger.warning("Could not save browser state for %s: %s", broker, e)
+        elif not success and from_cache:
+            # Cached state may be what broke the flow, so start clean next time
+            self.invalidate(broker)
+
+
+async def dismiss_consent(page) -> None:
+    """Click through the first visible cookie banner or consent prompt, if any"""
+    for selector in CONSENT_SELECTORS:
+        try:
+            if await page.is_visible(selector):
+                await page.click(selector)
+                await page.wait_for_load_state("networkidle")
+                return
+        except Exception as e:
+            logger.warning("Failed to dismiss consent prompt %s: %s", selector, e)
+
+
+def create_browser_state_cache() -> BrowserStateCache:
+    """Build the browser state cache from environment settings"""
+    return BrowserStateCache(
+        Path(os.environ.get('BROWSER_STATE_DIR', str(ROOT_DIR / 'browser_state'))),
+        ttl_seconds=int(os.environ.get('BROWSER_STATE_TTL_HOURS', '24')) * 3600,
+    )
@@ -0,0 +1,181 @@
+"""Evidence capture for automated removals.
+
+At the verify step of a broker flow the page is captured as a JPEG screenshot
+and its HTML. Playwright renders both in the browser process; hashing,
+compression and disk writes happen on a small thread pool so the event loop
+only awaits the result. Artifacts live in a content-addressed directory:
+the artifact id is the SHA-256 of the raw bytes plus the kind, identical
+captures are stored once, and old artifacts are pruned by age and by total
+size.
+"""
+import asyncio
+import gzip
+import hashlib
+import logging
+import os
+import re
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+from typing import Dict, Iterator, Optional
+
+logger = logging.getLogger(__name__)
+
+ROOT_DIR = Path(__file__).parent
+
+# kind -> (file suffix on disk, media type, gzip on write)
+ARTIFACT_KINDS = {
+    "html": (".html.gz", "text/html", True),
+    # JPEG is already compressed, gzip would only cost CPU
+    "jpg": (".jpg", "image/jpeg", False),
+}
+
+ARTIFACT_ID_PATTERN = re.compile(r"^[0-9a-f]{64}\.(html|jpg)$")
+
+CHUNK_SIZE = 64 * 1024
+
+
+class EvidenceStore:
+    """Content-addressed on-disk store for screenshots and page HTML"""
+
+    def __init__(
+        self,
+        directory: Path,
+        max_age_days: int = 90,
+        max_bytes: int = 1024 ** 3,
+        workers: int = 2,
+        prune_every: int = 50,
+    ):
+        self.directory = Path(directory)
+        self.max_age_seconds = max_age_days * 24 * 3600
+        self.max_bytes = max_bytes
+        self.prune_every = prune_every
+        self.executor = ThreadPoolExecutor(max_workers=workers, thread_name_prefix="evidence")
+        self.writes = 0
+        self.lock = threading.Lock()
+
+    async def capture(self, page) -> Dict[str, str]:
+        """Capture a page's screenshot and HTML, returning artifact ids by kind"""
+        artifacts = {}
+        try:
+            screenshot = await page.screenshot(type="jpeg", quality=70, full_page=True)
+            html = await page.content()
+            loop = asyncio.get_running_loop()
+            artifacts["screenshot"] = await loop.run_in_executor(self.executor, self.put, "jpg", screenshot)
+            artifacts["html"] = await loop.run_in_executor(self.executor, self.put, "html", html.encode("utf-8"))
+        except Exception as e:
+            # Evidence is best effort and must never fail a removal
+            logger.error("Evidence capture failed: %s", e)
+        return artifacts
+
+    def put(self, kind: str, data: bytes) -> str:
+        """Hash, compress and write an artifact, returning its id (runs on the thread pool)"""
+        suffix, _, compress = ARTIFACT_KINDS[kind]
+        artifact_id = f"{hashlib.sha256(data).hexdigest()}.{kind}"
+        path = self.path_for(artifact_id)
+
+        if path.exists():
+            # Duplicate capture; refresh its age so retention keeps it
+            os.utime(path)
+            return artifact_id
+
+        path.parent.mkdir(parents=True, exist_ok=True)
+        tmp_path = path.with_name(f"{path.name}.{threading.get_ident()}.tmp")
+        view = memoryview(data)
+        with open(tmp_path, "wb") as raw:
+            out = gzip.GzipFile(fileobj=raw, mode="wb", compresslevel=6, mtime=0) if compress else raw
+            for offset in range(0, len(view), CHUNK_SIZE):
+                out.write(view[offset:offset + CHUNK_SIZE])
+            if compress:
+                out.close()
+        os.replace(tmp_path, path)
+
+        with self.lock:
+            self.writes += 1
+            should_prune = self.writes % self.prune_every == 0
+        if should_prune:
+            self.prune()
+        return artifact_id
+
+    def path_for(self, artifact_id: str) -> Path:
+        if not ARTIFACT_ID_PATTERN.match(artifact_id):
+            raise ValueError(f"Invalid artifact id: {artifact_id}")
+        digest, kind = artifact_id.split(".", 1)
+        return self.directory / digest[:2] / f"{digest}{ARTIFACT_KINDS[kind][0]}"
+
+    def open(self, artifact_id: str):
+        """Return (path, media type, content encoding) for an artifact, or None if missing"""
+        try:
+            path = self.path_for(artifact_id)
+        except ValueError:
+            return None
+        if not path.exists():
+            return None
+        _, media_type, compressed = ARTIFACT_KINDS[artifact_id.split(".", 1)[1]]
+        return path, media_type, "gzip" if compressed else None
+
+    def prune(self) -> None:
+        """Drop artifacts older than the retention age, then the oldest until under the size cap"""
+        now = time.time()
+        files = []
+        for path in self.directory.glob("*/*"):
+            if path.name.endswith(".tmp"):
+                continue
+            try:
+                stat = path.stat()
+            except FileNotFoundError:
+                continue
+            if now - stat.st_mtime > self.max_age_seconds:
+                path.unlink(missing_ok=True)
+            else:
+                files.append((stat.st_mtime, stat.st_size, path))
+
+        total = sum(size for _, size, _ in files)
+        for _, size, path in sorted(files, key=lambda f: f[0]):
+            if total <= self.max_bytes:
+                break
+            path.unlink(missing_ok=True)
+            total -= size
+
+    async def close(self) -> None:
+        """Wait for pending writes without blocking the event loop"""
+        loop = asyncio.get_running_loop()
+        await loop.run_in_executor(None, self.executor.shutdown, True)
+
+
+def iter_decompressed(path: Path) -> Iterator[bytes]:
+    """Stream a gzipped artifact back as plain bytes for clients without gzip support"""
+    with gzip.open(path, "rb") as f:
+        while True:
+            chunk = f.read(CHUNK_SIZE)
+            if not chunk:
+                return
+            yield chunk
+
+
+def accepts_gzip(accept_encoding: Optional[str]) -> bool:
+    """Whether an Accept-Encoding header allows a gzip response body"""
+    for item in (accept_encoding or "").split(","):
+        coding, _, params = item.strip().partition(";")
+        if coding.strip().lower() in ("gzip", "*"):
+            quality = params.strip().lower()
+            if not quality.startswith("q="):
+                return True
+            try:
+                return float(quality[2:]) > 0
+            except ValueError:
+                return False
+    return False
+
+
+def create_evidence_store() -> Optional[EvidenceStore]:
+    """Build the evidence store when EVIDENCE_CAPTURE is enabled"""
+    if os.environ.get('EVIDENCE_CAPTURE', 'false').lower() not in ('1', 'true', 'yes'):
+        return None
+    return EvidenceStore(
+        Path(os.environ.get('EVIDENCE_DIR', str(ROOT_DIR / 'evidence'))),
+        max_age_days=int(os.environ.get('EVIDENCE_MAX_AGE_DAYS', '90')),
+        max_bytes=int(os.environ.get('EVIDENCE_MAX_MB', '1024')) * 1024 * 1024,
+        workers=int(os.environ.get('EVIDENCE_WORKERS', '2')),
+    )
@@ -0,0 +1,61 @@
+"""Streaming serializers for the removal history export.
+
+Rows are encoded as they come off the storage cursor and sent one batch
+per chunk, so an export of millions of requests uses the same memory as an
+export of ten without paying a send() per row.
+"""
+import csv
+import io
+import json
+from datetime import datetime
+from typing import Any, AsyncIterator, Dict
+
+from storage import REMOVAL_REQUEST_COLUMNS
+
+EXPORT_FORMATS = {
+    "ndjson": "application/x-ndjson",
+    "csv": "text/csv",
+}
+
+
+def _serialize(value: Any) -> Any:
+    if isinstance(value, datetime):
+        return value.isoformat()
+    return value
+
+
+async def stream_ndjson(rows: AsyncIterator[Dict[str, Any]], batch_size: int = 1000) -> AsyncIterator[str]:
+    lines = []
+    async for row in rows:
+        lines.append(json.dumps({c: _serialize(row.get(c)) for c in REMOVAL_REQUEST_COLUMNS}) + "\n")
+        if len(lines) >= batch_size:
+            yield "".join(lines)
+            lines = []
+    if lines:
+        yield "".join(lines)
+
+
+async def stream_csv(rows: AsyncIterator[Dict[str, Any]], batch_size: int = 1000) -> AsyncIterator[str]:
+    buffer = io.StringIO()
+    writer = csv.writer(buffer)
+    writer.writerow(REMOVAL_REQUEST_COLUMNS)
+    pending = 0
+    async for row in rows:
+        writer.writerow([_serialize(row.get(c)) for c in REMOVAL_REQUEST_COLUMNS])
+        pending += 1
+        if pending >= batch_size:
+            yield buffer.getvalue()
+            buffer.seek(0)
+            buffer.truncate()
+            pending = 0
+    if buffer.tell():
+        yield buffer.getvalue()
+
+
+def stream_export(
+    rows: AsyncIterator[Dict[str, Any]], export_format: str, batch_size: int = 1000
+) -> AsyncIterator[str]:
+    """Encode removal requests in the requested export format, one chunk per batch of rows"""
+    if export_format == "csv":
+        return stream_csv(rows, batch_size)
+    return stream_ndjson(rows, batch_size)
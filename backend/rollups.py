@@ -0,0 +1,298 @@
+"""Per-broker success-rate rollups.
+
+Every time a removal request reaches a terminal status, the transition is
+appended to a log and hourly and daily counters for (broker, status, error
+class) are incremented together with a log2-bucketed histogram of
+time-to-completion. Requests only keep their latest outcome (a retry clears
+the failure), so backfill rebuilds from the log rather than from the
+requests, with the same rules as live updates. Transitions from before the
+log existed are seeded once from each request's current state; failures
+that had already been retried by then are not recoverable. Analytics read
+these pre-aggregated buckets, so answering a query costs the same whether
+the removal_requests history holds a thousand rows or a hundred million.
+"""
+import logging
+import math
+from collections import defaultdict
+from datetime import datetime, timedelta
+from typing import Any, Dict, List, Optional, Tuple
+
+from storage import ROLLUP_KEY_FIELDS
+
+logger = logging.getLogger(__name__)
+
+GRANULARITIES = {
+    "hour": timedelta(hours=1),
+    "day": timedelta(days=1),
+}
+
+# Range answered when a query gives no start, and the widest range one query may span,
+# so the number of buckets read stays bounded however long the history grows
+DEFAULT_WINDOWS = {
+    "hour": timedelta(hours=48),
+    "day": timedelta(days=30),
+}
+MAX_WINDOWS = {
+    "hour": timedelta(days=31),
+    "day": timedelta(days=366),
+}
+
+TERMINAL_STATUSES = ("completed", "failed")
+
+
+def bucket_start(at: datetime, granularity: str) -> datetime:
+    if granularity == "day":
+        return at.replace(hour=0, minute=0, second=0, microsecond=0)
+    return at.replace(minute=0, second=0, microsecond=0)
+
+
+def query_window(
+    granularity: str, start: Optional[datetime] = None, end: Optional[datetime] = None
+) -> Tuple[datetime, datetime]:
+    """Resolve the [start, end) range of an analytics query, raising ValueError if it is too wide"""
+    end = end or datetime.utcnow()
+    if start is None:
+        start = bucket_start(end - DEFAULT_WINDOWS[granularity], granularity)
+    if end - start > MAX_WINDOWS[granularity]:
+        raise ValueError(
+            f"At most {MAX_WINDOWS[granularity].days} days of {granularity} rollups can be queried at once"
+        )
+    return start, end
+
+
+def classify_error(status: str, error_message: Optional[str]) -> str:
+    """Collapse free-form error messages into a small set of failure reasons"""
+    if status != "failed":
+        return "none"
+    if not error_message:
+        return "unknown"
+    message = error_message.lower()
+    if message == "automated removal failed":
+        return "flow_failed"
+    if "timeout" in message:
+        return "timeout"
+    if "net::" in message or "connection" in message:
+        return "network"
+    if "selector" in message or "locator" in message:
+        return "selector"
+    return "exception"
+
+
+def latency_bin(seconds: float) -> int:
+    """Histogram bin for a latency; bin n holds values in [2**n, 2**(n+1)) seconds"""
+    if seconds < 2:
+        return 0
+    return int(math.log2(seconds))
+
+
+def histogram_percentile(histogram: Dict[int, int], percentile: float) -> Optional[float]:
+    """Estimate a latency percentile in seconds from a merged histogram"""
+    total = sum(histogram.values())
+    if total == 0:
+        return None
+    target = percentile * total
+    seen = 0
+    for bin_index in sorted(histogram):
+        seen += histogram[bin_index]
+        if seen >= target:
+            # Geometric midpoint of the bin
+            return round(2 ** bin_index * math.sqrt(2), 1)
+    return None
+
+
+def transition_time(request: Dict[str, Any]) -> datetime:
+    """When a stored request reached its current terminal status"""
+    if request.get("status") == "completed" and request.get("completed_at"):
+        return request["completed_at"]
+    # Requests that failed before failed_at was recorded fall back to creation time
+    return request.get("failed_at") or request["created_at"]
+
+
+def _transition(
+    request: Dict[str, Any], status: str, error_message: Optional[str], at: datetime
+) -> Dict[str, Any]:
+    """Transition log entry for a request reaching a terminal status"""
+    return {
+        "request_id": request["id"],
+        "broker_name": request["broker_name"],
+        "status": status,
+        "error_message": error_message,
+        # Timed from when the request was last queued so retries are not timed from creation
+        "started_at": request.get("queued_at") or request.get("created_at"),
+        "at": at,
+    }
+
+
+def _contribution(transition: Dict[str, Any]):
+    """Rollup keys and latency for one transition, shared by live updates and backfill"""
+    status, at = transition["status"], transition["at"]
+    keys = [
+        {
+            "granularity": granularity,
+            "bucket_start": bucket_start(at, granularity),
+            "broker_name": transition["broker_name"],
+            "status": status,
+            "error_class": classify_error(status, transition.get("error_message")),
+        }
+        for granularity in GRANULARITIES
+    ]
+    # Time-to-completion only applies to completions
+    latency = None
+    if status == "completed" and transition.get("started_at") is not None:
+        latency = max((at - transition["started_at"]).total_seconds(), 0.0)
+    return keys, latency
+
+
+async def record_transition(
+    storage,
+    request: Dict[str, Any],
+    status: str,
+    error_message: Optional[str] = None,
+    at: Optional[datetime] = None,
+) -> None:
+    """Add a transition to the hourly and daily rollups; ``request`` is the document before the update"""
+    if request.get("status") == status:
+        # Not a transition, e.g. a manual removal marked complete twice
+        return
+
+    at = at or datetime.utcnow()
+    transition = _transition(request, status, error_message, at)
+    keys, latency = _contribution(transition)
+    histogram = {latency_bin(latency): 1} if latency is not None else {}
+    # While a backfill is building its staging copy, transitions after its
+    # snapshot are written there too so the swap does not lose them
+    targets = [False]
+    if _backfill_cutoff is not None and at >= _backfill_cutoff:
+        targets.append(True)
+
+    try:
+        await storage.insert_removal_transitions([transition])
+        for staging in targets:
+            for key in keys:
+                await storage.increment_rollup(key, 1, latency or 0.0, histogram, staging=staging)
+    except Exception as e:
+        # Rollups are best effort and must never fail a removal
+        logger.error("Failed to update rollups for %s: %s", request["broker_name"], e)
+
+
+_backfill_running = False
+_backfill_cutoff: Optional[datetime] = None
+
+
+def claim_backfill() -> bool:
+    """Reserve the single backfill slot, returning False if a backfill is already running"""
+    global _backfill_running
+    if _backfill_running:
+        return False
+    _backfill_running = True
+    return True
+
+
+async def seed_transition_log(storage, batch_size: int = 1000) -> int:
+    """Derive the transition log from current request state if it is empty, returning entries added"""
+    async for _ in storage.iter_removal_transitions(batch_size=1):
+        return 0
+
+    seeded = 0
+    for status in TERMINAL_STATUSES:
+        batch = []
+        async for request in storage.iter_removal_requests(status=status, batch_size=batch_size):
+            batch.append(_transition(request, status, request.get("error_message"), transition_time(request)))
+            if len(batch) >= batch_size:
+                await storage.insert_removal_transitions(batch)
+                seeded += len(batch)
+                batch = []
+        if batch:
+            await storage.insert_removal_transitions(batch)
+            seeded += len(batch)
+
+    if seeded:
+        logger.info("Seeded the transition log from %d removal requests", seeded)
+    return seeded
+
+
+async def backfill_rollups(storage, batch_size: int = 1000) -> int:
+    """Rebuild all rollups from the transition log, returning the number of transitions counted
+
+    Callers reserve the run with claim_backfill() first. The rebuild goes into
+    staging and is swapped in at the end, so analytics keep answering from the
+    old rollups meanwhile.
+    """
+    global _backfill_running, _backfill_cutoff
+    try:
+        await storage.reset_rollup_staging()
+        _backfill_cutoff = datetime.utcnow()
+
+        totals: Dict[tuple, Dict[str, Any]] = defaultdict(
+            lambda: {"count": 0, "latency_sum": 0.0, "latency_histogram": defaultdict(int)}
+        )
+        counted = 0
+        # Transitions at or after the cutoff are recorded live into staging already
+        async for transition in storage.iter_removal_transitions(end=_backfill_cutoff, batch_size=batch_size):
+            keys, latency = _contribution(transition)
+            for key in keys:
+                total = totals[tuple(key[field] for field in ROLLUP_KEY_FIELDS)]
+                total["count"] += 1
+                if latency is not None:
+                    total["latency_sum"] += latency
+                    total["latency_histogram"][latency_bin(latency)] += 1
+            counted += 1
+
+        for key_values, total in totals.items():
+            await storage.increment_rollup(
+                dict(zip(ROLLUP_KEY_FIELDS, key_values)),
+                total["count"],
+                total["latency_sum"],
+                dict(total["latency_histogram"]),
+                staging=True
+            )
+        await storage.swap_rollup_staging()
+    finally:
+        _backfill_cutoff = None
+        _backfill_running = False
+
+    logger.info("Backfilled broker rollups from %d transitions", counted)
+    return counted
+
+
+def summarize_rollups(rollups: List[Dict[str, Any]]) -> Dict[str, Any]:
+    """Merge rollup buckets into per-broker success rates, failure reasons and latency"""
+    brokers: Dict[str, Dict[str, Any]] = {}
+    for rollup in rollups:
+        broker = brokers.setdefault(rollup["broker_name"], {
+            "completed": 0,
+            "failed": 0,
+            "failure_reasons": defaultdict(int),
+            "latency_sum": 0.0,
+            "latency_histogram": defaultdict(int),
+            "series": defaultdict(lambda: {"completed": 0, "failed": 0}),
+        })
+        broker[rollup["status"]] += rollup["count"]
+        if rollup["status"] == "failed":
+            broker["failure_reasons"][rollup["error_class"]] += rollup["count"]
+        broker["latency_sum"] += rollup.get("latency_sum", 0.0)
+        for bin_index, bin_count in rollup.get("latency_histogram", {}).items():
+            broker["latency_histogram"][bin_index] += bin_count
+        broker["series"][rollup["bucket_start"].isoformat()][rollup["status"]] += rollup["count"]
+
+    summary = {}
+    for broker_name, broker in brokers.items():
+        total = broker["completed"] + broker["failed"]
+        timed = sum(broker["latency_histogram"].values())
+        summary[broker_name] = {
+            "total": total,
+            "completed": broker["completed"],
+            "failed": broker["failed"],
+            "success_rate": round(broker["completed"] / total, 4) if total else None,
+            "failure_reasons": dict(broker["failure_reasons"]),
+            "latency_seconds": {
+                "mean": round(broker["latency_sum"] / timed, 1) if timed else None,
+                "p50": histogram_percentile(broker["latency_histogram"], 0.5),
+                "p90": histogram_percentile(broker["latency_histogram"], 0.9),
+            },
+            "series": [
+                {"bucket_start": start, **counts}
+                for start, counts in sorted(broker["series"].items())
+            ],
+        }
+    return summary
@@ -1,29 +1,69 @@
-from fastapi import FastAPI, APIRouter, HTTPException, BackgroundTasks
+from fastapi import FastAPI, APIRouter, HTTPException, Query, BackgroundTasks, Request
 from fastapi.middleware.cors import CORSMiddleware
-from motor.motor_asyncio import AsyncIOMotorClient
+from fastapi.responses import StreamingResponse, FileResponse
 from pydantic import BaseModel, Field, EmailStr
-from typing import List, Optional, Dict, Any
-from datetime import datetime, timedelta
+from typing import List, Optional, Dict, Any, Tuple
+from datetime import datetime, timedelta, timezone
 import uuid
 import os
 import asyncio
 import logging
+from contextlib import asynccontextmanager
 from pathlib import Path
 from dotenv import load_dotenv
 import requests
 from playwright.async_api import async_playwright
+from storage import create_storage
+from admission import FIRST_TIME, RETRY, RESCAN, QueueFull, create_removal_queue, recover_removals
+from browser_state import create_browser_state_cache
+from export import EXPORT_FORMATS, stream_export
+from rollups import (
+    GRANULARITIES, backfill_rollups, claim_backfill, query_window, record_transition, seed_transition_log,
+    summarize_rollups
+)
+from structured_logging import configure_logging, log_context
+from evidence import accepts_gzip, create_evidence_store, iter_decompressed
 
 # Load environment variables
 ROOT_DIR = Path(__file__).parent
 load_dotenv(ROOT_DIR / '.env')
 
-# MongoDB connection
-mongo_url = os.environ.get('MONGO_URL', 'mongodb://localhost:27017')
-client = AsyncIOMotorClient(mongo_url)
-db = client[os.environ.get('DB_NAME', 'dataguard_pro')]
+# Storage backend (MongoDB by default, SQLite with STORAGE_BACKEND=sqlite)
+storage = create_storage()
+
+# Automated removals run from a bounded queue with priority lanes
+removal_queue = create_removal_queue(lambda user_id: process_automated_removals(user_id))
+
+# Cookies and localStorage reused across runs for each broker
+browser_state_cache = create_browser_state_cache()
+
+# Screenshots and page HTML kept as proof of each automated removal (optional)
+evidence_store = create_evidence_store()
+
+async def start_services():
+    await storage.connect()
+    await seed_transition_log(storage, EXPORT_BATCH_SIZE)
+    await recover_removals(storage, removal_queue)
+    removal_queue.start()
+
+async def stop_services():
+    await removal_queue.stop()
+    await storage.close()
+    if evidence_store:
+        await evidence_store.close()
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    await start_services()
+    yield
+    await stop_services()
 
 # FastAPI app
-app = FastAPI(title="DataGuard Pro API", description="Privacy Protection & Data Broker Removal Service")
+app = FastAPI(
+    title="DataGuard Pro API",
+    description="Privacy Protection & Data Broker Removal Service",
+    lifespan=lifespan
+)
 
 # CORS middleware
 app.add_middleware(
@@ -37,8 +77,11 @@ app.add_middleware(
 # API Router
 api_router = APIRouter(prefix="/api")
 
+# Default rows fetched per storage round trip when exporting removal history
+EXPORT_BATCH_SIZE = int(os.environ.get('EXPORT_BATCH_SIZE', '1000'))
+
 # Logging setup
-logging.basicConfig(level=logging.INFO)
+configure_logging()
 logger = logging.getLogger(__name__)
 
 # Data Models
@@ -67,6 +110,13 @@ class RemovalRequest(BaseModel):
     error_message: Optional[str] = None
     removal_url: Optional[str] = None
     confirmation_code: Optional[str] = None
+    attempts: int = 0
+    evidence_screenshot_id: Optional[str] = None
+    evidence_html_id: Optional[str] = None
+    queued_at: Optional[datetime] = None  # last time a retry or re-scan queued it
+    failed_at: Optional[datetime] = None
+    rescan_of: Optional[str] = None  # completed request this re-scan repeats
+    rescanned_at: Optional[datetime] = None  # when a re-scan of this completed request was queued
 
 # Data Broker Configurations
 DATA_BROKERS = {
@@ -135,26 +185,46 @@ async def get_data_brokers():
 async def register_user(personal_info: PersonalInfo):
     """Register a new user with personal information"""
     user = User(personal_info=personal_info)
-    await db.users.insert_one(user.dict())
-    logger.info(f"User registered: {user.id}")
+    await storage.insert_user(user.dict())
+    logger.info("User registered: %s", user.id, extra={"user_id": user.id})
     return user
 
 @api_router.get("/users/{user_id}", response_model=User)
 async def get_user(user_id: str):
     """Get user information"""
-    user_doc = await db.users.find_one({"id": user_id})
+    user_doc = await storage.get_user(user_id)
     if not user_doc:
         raise HTTPException(status_code=404, detail="User not found")
     return User(**user_doc)
 
+def naive_utc(value: Optional[datetime]) -> Optional[datetime]:
+    """Convert a timezone-aware query parameter to the naive UTC the database stores"""
+    if value is not None and value.tzinfo is not None:
+        return value.astimezone(timezone.utc).replace(tzinfo=None)
+    return value
+
+def reserve_removal_slot(lane: str):
+    """Reserve room in a removal lane or reject the request with 429"""
+    try:
+        removal_queue.reserve(lane)
+    except QueueFull as e:
+        logger.warning("Rejecting removal work for lane %s: queue is full", lane)
+        raise HTTPException(
+            status_code=429,
+            detail="Removal queue is full, please retry later",
+            headers={"Retry-After": str(e.retry_after)}
+        )
+
 @api_router.post("/removal/bulk")
-async def create_bulk_removal_requests(user_id: str, background_tasks: BackgroundTasks):
+async def create_bulk_removal_requests(user_id: str):
     """Create removal requests for all data brokers"""
     # Verify user exists
-    user_doc = await db.users.find_one({"id": user_id})
+    user_doc = await storage.get_user(user_id)
     if not user_doc:
         raise HTTPException(status_code=404, detail="User not found")
     
+    reserve_removal_slot(FIRST_TIME)
+    
     removal_requests = []
     
     # Create removal requests for all brokers
@@ -167,12 +237,16 @@ async def create_bulk_removal_requests(user_id: str, background_tasks: Backgroun
         removal_requests.append(removal_request.dict())
     
     # Insert all removal requests
-    await db.removal_requests.insert_many(removal_requests)
+    try:
+        await storage.insert_removal_requests(removal_requests)
+    except Exception:
+        removal_queue.release(FIRST_TIME)
+        raise
     
-    # Start automated removal process in background
-    background_tasks.add_task(process_automated_removals, user_id)
+    # Queue automated removal process
+    removal_queue.submit(FIRST_TIME, user_id)
     
-    logger.info(f"Created {len(removal_requests)} removal requests for user {user_id}")
+    logger.info("Created %d removal requests for user %s", len(removal_requests), user_id, extra={"user_id": user_id})
     return {
         "message": f"Created {len(removal_requests)} removal requests", 
         "total_requests": len(removal_requests),
@@ -180,33 +254,125 @@ async def create_bulk_removal_requests(user_id: str, background_tasks: Backgroun
         "manual_requests": len([r for r in removal_requests if r["removal_type"] == "manual"])
     }
 
+async def requeue_removal_requests(user_id: str, lane: str, from_status: str, reset: Dict[str, Any]) -> int:
+    """Move a user's automated requests back to pending and queue them in a lane"""
+    reserve_removal_slot(lane)
+    try:
+        count = await storage.update_user_removal_requests(
+            user_id,
+            {"removal_type": "automated", "status": from_status},
+            {"status": "pending", **reset}
+        )
+    except Exception:
+        removal_queue.release(lane)
+        raise
+    
+    if count == 0:
+        removal_queue.release(lane)
+        raise HTTPException(status_code=404, detail=f"No {from_status} automated removal requests found")
+    
+    removal_queue.submit(lane, user_id)
+    return count
+
+@api_router.post("/removal/retry")
+async def retry_failed_removals(user_id: str):
+    """Retry failed automated removals for a user"""
+    count = await requeue_removal_requests(
+        user_id, RETRY, "failed", {"error_message": None, "failed_at": None, "queued_at": datetime.utcnow()}
+    )
+    logger.info("Queued %d failed removal requests for retry for user %s", count, user_id, extra={"user_id": user_id})
+    return {"message": f"Queued {count} removal requests for retry", "queued_requests": count}
+
+@api_router.post("/removal/rescan")
+async def rescan_completed_removals(user_id: str):
+    """Re-run completed automated removals for a user to catch re-listed profiles"""
+    reserve_removal_slot(RESCAN)
+    try:
+        # Each re-scan is a new request linked through rescan_of, so the completion,
+        # confirmation code and evidence of the original stay on record
+        rescanned_at = datetime.utcnow()
+        completed = await storage.match_removal_requests(
+            {"user_id": user_id, "removal_type": "automated", "status": "completed", "rescanned_at": None},
+            limit=len(DATA_BROKERS)
+        )
+        rescans = []
+        for original in completed:
+            # Conditional, so concurrent re-scans cannot both claim the same completion
+            claimed = await storage.update_removal_requests(
+                {"id": original["id"], "rescanned_at": None},
+                {"rescanned_at": rescanned_at}
+            )
+            if claimed:
+                rescans.append(RemovalRequest(
+                    user_id=user_id,
+                    broker_name=original["broker_name"],
+                    removal_type=original["removal_type"],
+                    removal_url=original.get("removal_url"),
+                    queued_at=rescanned_at,
+                    rescan_of=original["id"]
+                ).dict())
+        await storage.insert_removal_requests(rescans)
+    except Exception:
+        removal_queue.release(RESCAN)
+        raise
+    
+    if not rescans:
+        removal_queue.release(RESCAN)
+        raise HTTPException(status_code=404, detail="No completed automated removal requests found")
+    
+    removal_queue.submit(RESCAN, user_id)
+    count = len(rescans)
+    logger.info("Queued %d completed removal requests for re-scan for user %s", count, user_id, extra={"user_id": user_id})
+    return {"message": f"Queued {count} removal requests for re-scan", "queued_requests": count}
+
 @api_router.get("/removal/status/{user_id}")
 async def get_removal_status(user_id: str):
     """Get removal status for all brokers for a user"""
-    cursor = db.removal_requests.find({"user_id": user_id})
-    requests = await cursor.to_list(length=100)
+    requests = await storage.find_removal_requests(user_id, limit=100)
     
-    # Convert MongoDB documents to proper format
+    # Convert stored documents to proper format
     formatted_requests = []
     for request in requests:
-        # Remove MongoDB _id field and convert datetime objects
-        request.pop('_id', None)
+        # Convert datetime objects
         if 'created_at' in request and hasattr(request['created_at'], 'isoformat'):
             request['created_at'] = request['created_at'].isoformat()
         if 'completed_at' in request and request['completed_at'] and hasattr(request['completed_at'], 'isoformat'):
             request['completed_at'] = request['completed_at'].isoformat()
         formatted_requests.append(request)
     
+    # Counts are aggregated by the storage backend, not limited to the rows above
+    status_counts = await storage.removal_stats(user_id)
     stats = {
-        "total": len(formatted_requests),
-        "pending": sum(1 for r in formatted_requests if r["status"] == "pending"),
-        "in_progress": sum(1 for r in formatted_requests if r["status"] == "in_progress"), 
-        "completed": sum(1 for r in formatted_requests if r["status"] == "completed"),
-        "failed": sum(1 for r in formatted_requests if r["status"] == "failed")
+        "total": sum(status_counts.values()),
+        "pending": status_counts.get("pending", 0),
+        "in_progress": status_counts.get("in_progress", 0),
+        "completed": status_counts.get("completed", 0),
+        "failed": status_counts.get("failed", 0)
     }
     
     return {"requests": formatted_requests, "stats": stats}
 
+@api_router.get("/removal/export")
+async def export_removal_history(
+    start: Optional[datetime] = None,
+    end: Optional[datetime] = None,
+    status: Optional[str] = None,
+    format: str = "ndjson",
+    batch_size: int = Query(EXPORT_BATCH_SIZE, ge=1, le=10000)
+):
+    """Stream all removal requests created in [start, end) as NDJSON or CSV"""
+    if format not in EXPORT_FORMATS:
+        raise HTTPException(status_code=400, detail=f"Unsupported export format: {format}")
+    
+    rows = storage.iter_removal_requests(
+        start=naive_utc(start), end=naive_utc(end), status=status, batch_size=batch_size
+    )
+    return StreamingResponse(
+        stream_export(rows, format, batch_size),
+        media_type=EXPORT_FORMATS[format],
+        headers={"Content-Disposition": f'attachment; filename="removal_requests.{format}"'}
+    )
+
 @api_router.get("/removal/manual/{broker_name}")
 async def get_manual_instructions(broker_name: str):
     """Get manual removal instructions for a specific broker"""
@@ -227,26 +393,80 @@ async def get_manual_instructions(broker_name: str):
 @api_router.post("/removal/manual/complete")
 async def mark_manual_removal_complete(user_id: str, broker_name: str, confirmation_code: Optional[str] = None):
     """Mark a manual removal as completed"""
-    result = await db.removal_requests.update_one(
-        {"user_id": user_id, "broker_name": broker_name},
+    completed_at = datetime.utcnow()
+    previous = await storage.update_broker_removal_request(
+        user_id,
+        broker_name,
         {
-            "$set": {
-                "status": "completed",
-                "completed_at": datetime.utcnow(),
-                "confirmation_code": confirmation_code
-            }
+            "status": "completed",
+            "completed_at": completed_at,
+            "confirmation_code": confirmation_code
         }
     )
     
-    if result.modified_count == 0:
+    if not previous:
         raise HTTPException(status_code=404, detail="Removal request not found")
     
+    await record_transition(storage, previous, "completed", at=completed_at)
+    
     return {"message": "Manual removal marked as completed"}
 
+@api_router.get("/analytics/brokers")
+async def get_broker_analytics(
+    granularity: str = "day",
+    start: Optional[datetime] = None,
+    end: Optional[datetime] = None,
+    broker_name: Optional[str] = None
+):
+    """Per-broker success rates, failure reasons and time-to-completion from pre-aggregated rollups
+
+    Without a start, the last 48 hours of hourly or 30 days of daily rollups are summarized.
+    """
+    if granularity not in GRANULARITIES:
+        raise HTTPException(status_code=400, detail=f"Unsupported granularity: {granularity}")
+    
+    try:
+        start, end = query_window(granularity, naive_utc(start), naive_utc(end))
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    
+    rollups = await storage.find_rollups(granularity, start=start, end=end, broker_name=broker_name)
+    return {"granularity": granularity, "start": start, "end": end, "brokers": summarize_rollups(rollups)}
+
+@api_router.post("/analytics/rollups/backfill", status_code=202)
+async def backfill_broker_rollups(background_tasks: BackgroundTasks):
+    """Rebuild broker rollups from the full removal history"""
+    if not claim_backfill():
+        raise HTTPException(status_code=409, detail="A rollup backfill is already running")
+    
+    background_tasks.add_task(backfill_rollups, storage, EXPORT_BATCH_SIZE)
+    return {"message": "Rollup backfill started"}
+
+@api_router.get("/evidence/{artifact_id}")
+async def get_evidence_artifact(artifact_id: str, request: Request):
+    """Download a screenshot or page HTML captured during an automated removal"""
+    artifact = evidence_store.open(artifact_id) if evidence_store else None
+    if not artifact:
+        raise HTTPException(status_code=404, detail="Evidence not found")
+    
+    path, media_type, encoding = artifact
+    headers = {"X-Content-Type-Options": "nosniff"}
+    if media_type == "text/html":
+        # Captured pages are third-party markup; never render them on the API origin
+        headers["Content-Disposition"] = f'attachment; filename="{artifact_id}"'
+        headers["Content-Security-Policy"] = "sandbox"
+    
+    if encoding:
+        headers["Vary"] = "Accept-Encoding"
+        if not accepts_gzip(request.headers.get("accept-encoding")):
+            return StreamingResponse(iter_decompressed(path), media_type=media_type, headers=headers)
+        headers["Content-Encoding"] = encoding
+    return FileResponse(path, media_type=media_type, headers=headers)
+
 @api_router.get("/email-template/{broker_name}")
 async def get_email_template(broker_name: str, user_id: str):
     """Generate personalized email template for manual removal"""
-    user_doc = await db.users.find_one({"id": user_id})
+    user_doc = await storage.get_user(user_id)
     if not user_doc:
         raise HTTPException(status_code=404, detail="User not found")
     
@@ -275,111 +495,150 @@ async def get_email_template(broker_name: str, user_id: str):
 # Background task for automated removals
 async def process_automated_removals(user_id: str):
     """Process automated removals using Playwright"""
-    logger.info(f"Starting automated removal process for user {user_id}")
-    
-    # Get user information
-    user_doc = await db.users.find_one({"id": user_id})
-    if not user_doc:
-        logger.error(f"User {user_id} not found")
-        return
-    
-    user = User(**user_doc)
-    
-    # Get automated removal requests
-    automated_requests = await db.removal_requests.find({
-        "user_id": user_id,
-        "removal_type": "automated",
-        "status": "pending"
-    }).to_list(100)
-    
-    async with async_playwright() as playwright:
-        browser = await playwright.chromium.launch(headless=True)
-        context = await browser.new_context()
+    with log_context(user_id=user_id):
+        logger.info("Starting automated removal process for user %s", user_id)
         
-        for request in automated_requests:
-            try:
-                # Update status to in_progress
-                await db.removal_requests.update_one(
-                    {"id": request["id"]},
-                    {"$set": {"status": "in_progress"}}
-                )
-                
-                # Process removal based on broker
+        # Get user information
+        user_doc = await storage.get_user(user_id)
+        if not user_doc:
+            logger.error("User %s not found", user_id)
+            return
+        
+        user = User(**user_doc)
+        
+        # Get automated removal requests
+        automated_requests = await storage.find_removal_requests(
+            user_id,
+            removal_type="automated",
+            status="pending",
+            limit=100
+        )
+        
+        async with async_playwright() as playwright:
+            browser = await playwright.chromium.launch(headless=True)
+            
+            for request in automated_requests:
                 broker_name = request["broker_name"].lower().replace(" ", "")
-                success = await process_broker_removal(context, broker_name, user)
-                
-                # Update status based on result
-                if success:
-                    await db.removal_requests.update_one(
-                        {"id": request["id"]},
-                        {
-                            "$set": {
-                                "status": "completed",
-                                "completed_at": datetime.utcnow()
-                            }
-                        }
-                    )
-                else:
-                    await db.removal_requests.update_one(
-                        {"id": request["id"]},
-                        {
-                            "$set": {
-                                "status": "failed",
-                                "error_message": "Automated removal failed"
-                            }
-                        }
-                    )
-                
-                # Wait between requests to avoid rate limiting
-                await asyncio.sleep(5)
-                
-            except Exception as e:
-                logger.error(f"Error processing removal for {request['broker_name']}: {str(e)}")
-                await db.removal_requests.update_one(
-                    {"id": request["id"]},
-                    {
-                        "$set": {
-                            "status": "failed",
-                            "error_message": str(e)
-                        }
-                    }
-                )
-        
-        await browser.close()
-
-async def process_broker_removal(context, broker_name: str, user: User) -> bool:
-    """Process removal for a specific broker using Playwright"""
+                attempt = (request.get("attempts") or 0) + 1
+                with log_context(broker=broker_name, request_id=request["id"], attempt=attempt):
+                    await process_removal_request(browser, request, broker_name, attempt, user)
+            
+            await browser.close()
+
+async def process_removal_request(browser, request: Dict[str, Any], broker_name: str, attempt: int, user: User):
+    """Run a single automated removal request and record its outcome"""
     try:
-        page = await context.new_page()
+        # Claim the request only if it is still pending, so a concurrent job never runs it twice
+        claimed = await storage.update_removal_requests(
+            {"id": request["id"], "status": "pending"},
+            {"status": "in_progress", "attempts": attempt}
+        )
+        if not claimed:
+            logger.info("Removal request already claimed, skipping", extra={"event": "removal_skipped"})
+            return
+        logger.info("Removal request in progress", extra={"event": "removal_in_progress"})
+        
+        # Process removal based on broker
+        context, from_cache = await browser_state_cache.open_context(browser, broker_name)
+        success = False
+        try:
+            success, evidence = await process_broker_removal(context, broker_name, user)
+        finally:
+            try:
+                browser_state_cache.finish(context, broker_name, from_cache, success)
+            finally:
+                await context.close()
+        
+        evidence_fields = {
+            "evidence_screenshot_id": evidence.get("screenshot"),
+            "evidence_html_id": evidence.get("html")
+        }
         
+        # Update status based on result
+        if success:
+            completed_at = datetime.utcnow()
+            await storage.update_removal_request(
+                request["id"],
+                {
+                    "status": "completed",
+                    "completed_at": completed_at,
+                    **evidence_fields
+                }
+            )
+            await record_transition(storage, request, "completed", at=completed_at)
+            logger.info("Removal request completed", extra={"event": "removal_completed"})
+        else:
+            failed_at = datetime.utcnow()
+            await storage.update_removal_request(
+                request["id"],
+                {
+                    "status": "failed",
+                    "error_message": "Automated removal failed",
+                    "failed_at": failed_at,
+                    **evidence_fields
+                }
+            )
+            await record_transition(storage, request, "failed", "Automated removal failed", at=failed_at)
+            logger.warning("Removal request failed", extra={"event": "removal_failed"})
+        
+        # Wait between requests to avoid rate limiting
+        await asyncio.sleep(5)
+        
+    except Exception as e:
+        logger.error("Error processing removal for %s: %s", request["broker_name"], e, extra={"event": "removal_error"})
+        failed_at = datetime.utcnow()
+        await storage.update_removal_request(
+            request["id"],
+            {
+                "status": "failed",
+                "error_message": str(e),
+                "failed_at": failed_at
+            }
+        )
+        await record_transition(storage, request, "failed", str(e), at=failed_at)
+
+async def process_broker_removal(context, broker_name: str, user: User) -> Tuple[bool, Dict[str, str]]:
+    """Process removal for a specific broker using Playwright, returning success and evidence artifact ids"""
+    page = await context.new_page()
+    success = False
+    try:
         if broker_name == "whitepages":
-            return await process_whitepages_removal(page, user)
+            success = await process_whitepages_removal(page, user)
         elif broker_name == "spokeo":
-            return await process_spokeo_removal(page, user)
+            success = await process_spokeo_removal(page, user)
         elif broker_name == "beenverified":
-            return await process_beenverified_removal(page, user)
+            success = await process_beenverified_removal(page, user)
         elif broker_name == "intelius":
-            return await process_intelius_removal(page, user)
+            success = await process_intelius_removal(page, user)
         elif broker_name == "truepeoplesearch":
-            return await process_truepeoplesearch_removal(page, user)
+            success = await process_truepeoplesearch_removal(page, user)
         elif broker_name == "mylife":
-            return await process_mylife_removal(page, user)
+            success = await process_mylife_removal(page, user)
         else:
-            logger.warning(f"No removal process defined for broker: {broker_name}")
-            return False
+            logger.warning("No removal process defined for broker: %s", broker_name)
             
     except Exception as e:
-        logger.error(f"Error in broker removal for {broker_name}: {str(e)}")
-        return False
+        logger.error("Error in broker removal for %s: %s", broker_name, e)
+    
+    try:
+        # Keep proof of what the page showed at the verify step
+        evidence = await evidence_store.capture(page) if evidence_store else {}
     finally:
         await page.close()
+    
+    return success, evidence
 
 # Broker-specific removal functions
+async def open_removal_page(page, url: str):
+    """Load a broker's removal page and checkpoint its consent state before any form is filled"""
+    await page.goto(url)
+    await page.wait_for_load_state("networkidle")
+    await browser_state_cache.checkpoint(page)
+
 async def process_whitepages_removal(page, user: User) -> bool:
     """Process Whitepages removal"""
     try:
-        await page.goto("https://www.whitepages.com/suppression-requests")
-        await page.wait_for_load_state("networkidle")
+        await open_removal_page(page, "https://www.whitepages.com/suppression-requests")
         
         # Fill form fields
         await page.fill('input[name="first_name"]', user.personal_info.first_name)
@@ -395,14 +654,13 @@ async def process_whitepages_removal(page, user: User) -> bool:
         return "submitted" in success_text.lower() or "received" in success_text.lower()
         
     except Exception as e:
-        logger.error(f"Whitepages removal error: {str(e)}")
+        logger.error("Whitepages removal error: %s", e)
         return False
 
 async def process_spokeo_removal(page, user: User) -> bool:
     """Process Spokeo removal"""
     try:
-        await page.goto("https://www.spokeo.com/optout")
-        await page.wait_for_load_state("networkidle")
+        await open_removal_page(page, "https://www.spokeo.com/optout")
         
         # Fill form
         await page.fill('input[name="email"]', user.personal_info.email)
@@ -417,14 +675,13 @@ async def process_spokeo_removal(page, user: User) -> bool:
         return await page.is_visible("text=request has been submitted")
         
     except Exception as e:
-        logger.error(f"Spokeo removal error: {str(e)}")
+        logger.error("Spokeo removal error: %s", e)
         return False
 
 async def process_beenverified_removal(page, user: User) -> bool:
     """Process BeenVerified removal"""
     try:
-        await page.goto("https://www.beenverified.com/app/optout/search")
-        await page.wait_for_load_state("networkidle")
+        await open_removal_page(page, "https://www.beenverified.com/app/optout/search")
         
         # Search for profile first
         await page.fill('input[name="firstName"]', user.personal_info.first_name)
@@ -443,14 +700,13 @@ async def process_beenverified_removal(page, user: User) -> bool:
         return False
         
     except Exception as e:
-        logger.error(f"BeenVerified removal error: {str(e)}")
+        logger.error("BeenVerified removal error: %s", e)
         return False
 
 async def process_intelius_removal(page, user: User) -> bool:
     """Process Intelius removal"""
     try:
-        await page.goto("https://www.intelius.com/optout")
-        await page.wait_for_load_state("networkidle")
+        await open_removal_page(page, "https://www.intelius.com/optout")
         
         # Fill removal form
         await page.fill('input[name="first_name"]', user.personal_info.first_name)
@@ -463,14 +719,13 @@ async def process_intelius_removal(page, user: User) -> bool:
         return await page.is_visible("text=successfully")
         
     except Exception as e:
-        logger.error(f"Intelius removal error: {str(e)}")
+        logger.error("Intelius removal error: %s", e)
         return False
 
 async def process_truepeoplesearch_removal(page, user: User) -> bool:
     """Process TruePeopleSearch removal"""
     try:
-        await page.goto("https://www.truepeoplesearch.com/removal")
-        await page.wait_for_load_state("networkidle")
+        await open_removal_page(page, "https://www.truepeoplesearch.com/removal")
         
         # Fill form
         await page.fill('input[name="name"]', f"{user.personal_info.first_name} {user.personal_info.last_name}")
@@ -482,14 +737,13 @@ async def process_truepeoplesearch_removal(page, user: User) -> bool:
         return await page.is_visible("text=submitted")
         
     except Exception as e:
-        logger.error(f"TruePeopleSearch removal error: {str(e)}")
+        logger.error("TruePeopleSearch removal error: %s", e)
         return False
 
 async def process_mylife_removal(page, user: User) -> bool:
     """Process MyLife removal"""
     try:
-        await page.goto("https://www.mylife.com/privacy-policy")
-        await page.wait_for_load_state("networkidle")
+        await open_removal_page(page, "https://www.mylife.com/privacy-policy")
         
         # Look for contact email or form
         if await page.is_visible("text=privacy@mylife.com"):
@@ -499,7 +753,7 @@ async def process_mylife_removal(page, user: User) -> bool:
         return False
         
     except Exception as e:
-        logger.error(f"MyLife removal error: {str(e)}")
+        logger.error("MyLife removal error: %s", e)
         return False
 
 # Manual removal instructions
@@ -17,6 +17,14 @@ load_dotenv(ROOT_DIR / '.env')
 
 DATABASE_PATH = ROOT_DIR / "dataguard.db"
 
+# The desktop build always runs the full removal API in-process against the
+# local file, whatever a copied .env says about the web deployment's storage
+os.environ['STORAGE_BACKEND'] = 'sqlite'
+os.environ['SQLITE_PATH'] = str(DATABASE_PATH)
+
+import server
+from structured_logging import configure_logging
+
 # Create SQLite database and table
 async def create_database():
     async with aiosqlite.connect(DATABASE_PATH) as db:
@@ -43,9 +51,11 @@ class StatusCheckCreate(BaseModel):
 async def lifespan(app: FastAPI):
     # Startup
     await create_database()
+    await server.start_services()
     logger.info("Database initialized")
     yield
     # Shutdown
+    await server.stop_services()
     logger.info("Application shutting down")
 
 # Create the main app with lifespan
@@ -86,8 +96,9 @@ async def get_status_checks():
                 for row in rows
             ]
 
-# Include the router in the main app
+# Include the router in the main app, followed by the removal API from server.py
 app.include_router(api_router)
+app.include_router(server.api_router)
 
 app.add_middleware(
     CORSMiddleware,
@@ -97,11 +108,8 @@ app.add_middleware(
     allow_headers=["*"],
 )
 
-# Configure logging
-logging.basicConfig(
-    level=logging.INFO,
-    format='%(asctime)s - %(name)s - %(levelname)s - %(message)s'
-)
+# Configure logging (shared queue-backed pipeline from server.py)
+configure_logging()
 logger = logging.getLogger(__name__)
 
 if __name__ == "__main__":
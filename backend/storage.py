@@ -0,0 +1,771 @@
+"""Storage backends for DataGuard Pro.
+
+The removal API talks to a ``Storage`` object instead of a raw database
+handle so the same routes can run against MongoDB (web deployments) or an
+embedded SQLite file (single-machine and desktop installs).
+"""
+import json
+from abc import ABC, abstractmethod
+import os
+from datetime import datetime
+from pathlib import Path
+from typing import Any, AsyncIterator, Dict, List, Optional
+
+ROOT_DIR = Path(__file__).parent
+
+# Columns stored for each removal request, in table order
+REMOVAL_REQUEST_COLUMNS = [
+    "id",
+    "user_id",
+    "broker_name",
+    "removal_type",
+    "status",
+    "created_at",
+    "completed_at",
+    "error_message",
+    "removal_url",
+    "confirmation_code",
+    "attempts",
+    "evidence_screenshot_id",
+    "evidence_html_id",
+    "queued_at",
+    "failed_at",
+    "rescan_of",
+    "rescanned_at",
+]
+
+# SQLite column types for removal request columns that are not plain TEXT
+REMOVAL_REQUEST_COLUMN_TYPES = {
+    "attempts": "INTEGER DEFAULT 0",
+}
+
+# Columns of the append-only log of terminal status transitions rollups are built from
+TRANSITION_COLUMNS = ["request_id", "broker_name", "status", "error_message", "started_at", "at"]
+
+DATETIME_FIELDS = (
+    "created_at", "updated_at", "completed_at", "queued_at", "failed_at", "rescanned_at",
+    "started_at", "at", "bucket_start"
+)
+
+# Fields identifying one broker rollup bucket
+ROLLUP_KEY_FIELDS = ["granularity", "bucket_start", "broker_name", "status", "error_class"]
+
+
+class Storage(ABC):
+    """Interface shared by all storage backends"""
+
+    @abstractmethod
+    async def connect(self) -> None:
+        pass
+
+    @abstractmethod
+    async def close(self) -> None:
+        pass
+
+    @abstractmethod
+    async def insert_user(self, user: Dict[str, Any]) -> None:
+        pass
+
+    @abstractmethod
+    async def get_user(self, user_id: str) -> Optional[Dict[str, Any]]:
+        pass
+
+    @abstractmethod
+    async def insert_removal_requests(self, requests: List[Dict[str, Any]]) -> None:
+        pass
+
+    @abstractmethod
+    async def find_removal_requests(
+        self,
+        user_id: str,
+        removal_type: Optional[str] = None,
+        status: Optional[str] = None,
+        limit: int = 100,
+    ) -> List[Dict[str, Any]]:
+        pass
+
+    @abstractmethod
+    async def update_removal_request(self, request_id: str, fields: Dict[str, Any]) -> bool:
+        """Update a single removal request by id, returning whether it matched"""
+
+    @abstractmethod
+    async def update_broker_removal_request(
+        self, user_id: str, broker_name: str, fields: Dict[str, Any]
+    ) -> Optional[Dict[str, Any]]:
+        """Update the removal request for a user/broker pair, returning it as it was before the update"""
+
+    @abstractmethod
+    async def update_user_removal_requests(
+        self, user_id: str, match: Dict[str, Any], fields: Dict[str, Any]
+    ) -> int:
+        """Update every removal request of a user matching the given fields, returning the count"""
+
+    @abstractmethod
+    async def update_removal_requests(self, match: Dict[str, Any], fields: Dict[str, Any]) -> int:
+        """Update every removal request matching the given fields, returning the count"""
+
+    @abstractmethod
+    async def match_removal_requests(
+        self, match: Dict[str, Any], limit: Optional[int] = None
+    ) -> List[Dict[str, Any]]:
+        """Return removal requests matching the given fields; a None value matches a missing field"""
+
+    @abstractmethod
+    async def removal_stats(self, user_id: str) -> Dict[str, int]:
+        """Count a user's removal requests per status"""
+
+    @abstractmethod
+    def iter_removal_requests(
+        self,
+        start: Optional[datetime] = None,
+        end: Optional[datetime] = None,
+        status: Optional[str] = None,
+        batch_size: int = 1000,
+    ) -> AsyncIterator[Dict[str, Any]]:
+        """Stream removal requests created in [start, end) ordered by creation time"""
+
+    @abstractmethod
+    async def insert_removal_transitions(self, transitions: List[Dict[str, Any]]) -> None:
+        """Append entries to the transition log"""
+
+    @abstractmethod
+    def iter_removal_transitions(
+        self, end: Optional[datetime] = None, batch_size: int = 1000
+    ) -> AsyncIterator[Dict[str, Any]]:
+        """Stream logged transitions that happened before end, in the order they were logged"""
+
+    @abstractmethod
+    async def increment_rollup(
+        self,
+        key: Dict[str, Any],
+        count: int,
+        latency_sum: float,
+        latency_histogram: Dict[int, int],
+        staging: bool = False,
+    ) -> None:
+        """Add counts to the broker rollup identified by ROLLUP_KEY_FIELDS, live or staging"""
+
+    @abstractmethod
+    async def find_rollups(
+        self,
+        granularity: str,
+        start: Optional[datetime] = None,
+        end: Optional[datetime] = None,
+        broker_name: Optional[str] = None,
+    ) -> List[Dict[str, Any]]:
+        """Return rollups of one granularity with bucket_start in [start, end)"""
+
+    @abstractmethod
+    async def reset_rollup_staging(self) -> None:
+        """Empty the staging rollups a backfill builds into"""
+
+    @abstractmethod
+    async def swap_rollup_staging(self) -> None:
+        """Atomically replace the live rollups with the staging rollups"""
+
+
+class MongoStorage(Storage):
+    """MongoDB backend used by the hosted web service"""
+
+    def __init__(self, mongo_url: str, db_name: str):
+        self.mongo_url = mongo_url
+        self.db_name = db_name
+        self.client = None
+        self.db = None
+
+    async def connect(self) -> None:
+        from motor.motor_asyncio import AsyncIOMotorClient
+
+        self.client = AsyncIOMotorClient(self.mongo_url)
+        self.db = self.client[self.db_name]
+        await self.db.users.create_index("id", unique=True)
+        await self.db.removal_requests.create_index("id", unique=True)
+        await self.db.removal_requests.create_index([("user_id", 1), ("status", 1)])
+        await self.db.removal_requests.create_index([("created_at", 1)])
+        await self.db.removal_requests.create_index([("status", 1), ("created_at", 1)])
+        await self.db.removal_transitions.create_index([("at", 1)])
+        await self._create_rollup_indexes(self.db.broker_rollups)
+
+    async def _create_rollup_indexes(self, collection) -> None:
+        await collection.create_index([(field, 1) for field in ROLLUP_KEY_FIELDS], unique=True)
+        await collection.create_index([("granularity", 1), ("bucket_start", 1)])
+
+    async def close(self) -> None:
+        if self.client is not None:
+            self.client.close()
+
+    async def insert_user(self, user: Dict[str, Any]) -> None:
+        await self.db.users.insert_one(dict(user))
+
+    async def get_user(self, user_id: str) -> Optional[Dict[str, Any]]:
+        return await self.db.users.find_one({"id": user_id}, {"_id": 0})
+
+    async def insert_removal_requests(self, requests: List[Dict[str, Any]]) -> None:
+        if requests:
+            await self.db.removal_requests.insert_many([dict(r) for r in requests], ordered=False)
+
+    async def find_removal_requests(
+        self,
+        user_id: str,
+        removal_type: Optional[str] = None,
+        status: Optional[str] = None,
+        limit: int = 100,
+    ) -> List[Dict[str, Any]]:
+        query: Dict[str, Any] = {"user_id": user_id}
+        if removal_type is not None:
+            query["removal_type"] = removal_type
+        if status is not None:
+            query["status"] = status
+        cursor = self.db.removal_requests.find(query, {"_id": 0})
+        return await cursor.to_list(length=limit)
+
+    async def update_removal_request(self, request_id: str, fields: Dict[str, Any]) -> bool:
+        _check_columns(fields)
+        result = await self.db.removal_requests.update_one({"id": request_id}, {"$set": fields})
+        return result.matched_count > 0
+
+    async def update_broker_removal_request(
+        self, user_id: str, broker_name: str, fields: Dict[str, Any]
+    ) -> Optional[Dict[str, Any]]:
+        _check_columns(fields)
+        return await self.db.removal_requests.find_one_and_update(
+            {"user_id": user_id, "broker_name": broker_name},
+            {"$set": fields},
+            projection={"_id": 0}
+        )
+
+    async def update_user_removal_requests(
+        self, user_id: str, match: Dict[str, Any], fields: Dict[str, Any]
+    ) -> int:
+        return await self.update_removal_requests({"user_id": user_id, **match}, fields)
+
+    async def update_removal_requests(self, match: Dict[str, Any], fields: Dict[str, Any]) -> int:
+        _check_columns(match)
+        _check_columns(fields)
+        result = await self.db.removal_requests.update_many(match, {"$set": fields})
+        return result.matched_count
+
+    async def match_removal_requests(
+        self, match: Dict[str, Any], limit: Optional[int] = None
+    ) -> List[Dict[str, Any]]:
+        _check_columns(match)
+        cursor = self.db.removal_requests.find(match, {"_id": 0})
+        return await cursor.to_list(length=limit)
+
+    async def removal_stats(self, user_id: str) -> Dict[str, int]:
+        pipeline = [
+            {"$match": {"user_id": user_id}},
+            {"$group": {"_id": "$status", "count": {"$sum": 1}}},
+        ]
+        stats = {}
+        async for row in self.db.removal_requests.aggregate(pipeline):
+            stats[row["_id"]] = row["count"]
+        return stats
+
+    async def iter_removal_requests(
+        self,
+        start: Optional[datetime] = None,
+        end: Optional[datetime] = None,
+        status: Optional[str] = None,
+        batch_size: int = 1000,
+    ) -> AsyncIterator[Dict[str, Any]]:
+        query: Dict[str, Any] = {}
+        created_at: Dict[str, Any] = {}
+        if start is not None:
+            created_at["$gte"] = start
+        if end is not None:
+            created_at["$lt"] = end
+        if created_at:
+            query["created_at"] = created_at
+        if status is not None:
+            query["status"] = status
+        projection = {"_id": 0, **{c: 1 for c in REMOVAL_REQUEST_COLUMNS}}
+        cursor = self.db.removal_requests.find(query, projection).sort("created_at", 1).batch_size(batch_size)
+        async for doc in cursor:
+            yield doc
+
+    async def insert_removal_transitions(self, transitions: List[Dict[str, Any]]) -> None:
+        if transitions:
+            await self.db.removal_transitions.insert_many([dict(t) for t in transitions])
+
+    async def iter_removal_transitions(
+        self, end: Optional[datetime] = None, batch_size: int = 1000
+    ) -> AsyncIterator[Dict[str, Any]]:
+        query = {"at": {"$lt": end}} if end is not None else {}
+        projection = {"_id": 0, **{c: 1 for c in TRANSITION_COLUMNS}}
+        async for doc in self.db.removal_transitions.find(query, projection).batch_size(batch_size):
+            yield doc
+
+    async def increment_rollup(
+        self,
+        key: Dict[str, Any],
+        count: int,
+        latency_sum: float,
+        latency_histogram: Dict[int, int],
+        staging: bool = False,
+    ) -> None:
+        increments: Dict[str, Any] = {"count": count, "latency_sum": latency_sum}
+        for latency_bin, bin_count in latency_histogram.items():
+            increments[f"latency_histogram.{latency_bin}"] = bin_count
+        collection = self.db.broker_rollups_staging if staging else self.db.broker_rollups
+        await collection.update_one(
+            {field: key[field] for field in ROLLUP_KEY_FIELDS},
+            {"$inc": increments},
+            upsert=True
+        )
+
+    async def find_rollups(
+        self,
+        granularity: str,
+        start: Optional[datetime] = None,
+        end: Optional[datetime] = None,
+        broker_name: Optional[str] = None,
+    ) -> List[Dict[str, Any]]:
+        query: Dict[str, Any] = {"granularity": granularity}
+        bucket_start: Dict[str, Any] = {}
+        if start is not None:
+            bucket_start["$gte"] = start
+        if end is not None:
+            bucket_start["$lt"] = end
+        if bucket_start:
+            query["bucket_start"] = bucket_start
+        if broker_name is not None:
+            query["broker_name"] = broker_name
+        rollups = []
+        async for doc in self.db.broker_rollups.find(query, {"_id": 0}).sort("bucket_start", 1):
+            doc["latency_histogram"] = {
+                int(latency_bin): bin_count
+                for latency_bin, bin_count in doc.get("latency_histogram", {}).items()
+            }
+            rollups.append(doc)
+        return rollups
+
+    async def reset_rollup_staging(self) -> None:
+        await self.db.broker_rollups_staging.drop()
+        # Creating the indexes also creates the collection, so a swap of an
+        # empty rebuild still has something to rename
+        await self._create_rollup_indexes(self.db.broker_rollups_staging)
+
+    async def swap_rollup_staging(self) -> None:
+        await self.db.broker_rollups_staging.rename("broker_rollups", dropTarget=True)
+
+
+class SQLiteStorage(Storage):
+    """Embedded SQLite backend for single-machine and desktop installs"""
+
+    def __init__(self, path: Path):
+        self.path = Path(path)
+        self.conn = None
+
+    async def connect(self) -> None:
+        import aiosqlite
+
+        self.conn = await aiosqlite.connect(self.path)
+        self.conn.row_factory = aiosqlite.Row
+        # WAL lets status polls read while the removal worker writes
+        await self.conn.execute("PRAGMA journal_mode=WAL")
+        await self.conn.execute("PRAGMA synchronous=NORMAL")
+        await self.conn.execute("PRAGMA busy_timeout=5000")
+        await self.conn.execute('''
+            CREATE TABLE IF NOT EXISTS users (
+                id TEXT PRIMARY KEY,
+                personal_info TEXT NOT NULL,
+                created_at TEXT NOT NULL,
+                updated_at TEXT NOT NULL
+            )
+        ''')
+        await self.conn.execute('''
+            CREATE TABLE IF NOT EXISTS removal_requests (
+                id TEXT PRIMARY KEY,
+                user_id TEXT NOT NULL,
+                broker_name TEXT NOT NULL,
+                removal_type TEXT NOT NULL,
+                status TEXT NOT NULL,
+                created_at TEXT NOT NULL,
+                completed_at TEXT,
+                error_message TEXT,
+                removal_url TEXT,
+                confirmation_code TEXT,
+                attempts INTEGER DEFAULT 0,
+                evidence_screenshot_id TEXT,
+                evidence_html_id TEXT,
+                queued_at TEXT,
+                failed_at TEXT,
+                rescan_of TEXT,
+                rescanned_at TEXT
+            )
+        ''')
+        await self._add_missing_columns(
+            "removal_requests", REMOVAL_REQUEST_COLUMNS, REMOVAL_REQUEST_COLUMN_TYPES
+        )
+        await self.conn.execute(
+            "CREATE INDEX IF NOT EXISTS idx_removal_user_status ON removal_requests (user_id, status)"
+        )
+        await self.conn.execute(
+            "CREATE INDEX IF NOT EXISTS idx_removal_user_broker ON removal_requests (user_id, broker_name)"
+        )
+        await self.conn.execute(
+            "CREATE INDEX IF NOT EXISTS idx_removal_created ON removal_requests (created_at, id)"
+        )
+        await self.conn.execute(
+            "CREATE INDEX IF NOT EXISTS idx_removal_status_created ON removal_requests (status, created_at, id)"
+        )
+        await self.conn.execute('''
+            CREATE TABLE IF NOT EXISTS removal_transitions (
+                request_id TEXT NOT NULL,
+                broker_name TEXT NOT NULL,
+                status TEXT NOT NULL,
+                error_message TEXT,
+                started_at TEXT,
+                at TEXT NOT NULL
+            )
+        ''')
+        # Live rollups plus an identical staging copy that backfills build into
+        for suffix in ("", "_staging"):
+            await self.conn.execute(f'''
+                CREATE TABLE IF NOT EXISTS broker_rollups{suffix} (
+                    granularity TEXT NOT NULL,
+                    bucket_start TEXT NOT NULL,
+                    broker_name TEXT NOT NULL,
+                    status TEXT NOT NULL,
+                    error_class TEXT NOT NULL,
+                    count INTEGER NOT NULL DEFAULT 0,
+                    latency_sum REAL NOT NULL DEFAULT 0,
+                    PRIMARY KEY (granularity, bucket_start, broker_name, status, error_class)
+                )
+            ''')
+            await self.conn.execute(f'''
+                CREATE TABLE IF NOT EXISTS broker_rollup_latency{suffix} (
+                    granularity TEXT NOT NULL,
+                    bucket_start TEXT NOT NULL,
+                    broker_name TEXT NOT NULL,
+                    status TEXT NOT NULL,
+                    error_class TEXT NOT NULL,
+                    bin INTEGER NOT NULL,
+                    count INTEGER NOT NULL DEFAULT 0,
+                    PRIMARY KEY (granularity, bucket_start, broker_name, status, error_class, bin)
+                )
+            ''')
+        await self.conn.commit()
+
+    async def _add_missing_columns(
+        self, table: str, columns: List[str], column_types: Dict[str, str]
+    ) -> None:
+        """Bring databases created by older versions up to the current column set"""
+        async with self.conn.execute(f"PRAGMA table_info({table})") as cursor:
+            existing = {row["name"] for row in await cursor.fetchall()}
+        for column in columns:
+            if column not in existing:
+                column_type = column_types.get(column, "TEXT")
+                await self.conn.execute(f"ALTER TABLE {table} ADD COLUMN {column} {column_type}")
+
+    async def close(self) -> None:
+        if self.conn is not None:
+            await self.conn.close()
+            self.conn = None
+
+    async def insert_user(self, user: Dict[str, Any]) -> None:
+        await self.conn.execute(
+            "INSERT INTO users (id, personal_info, created_at, updated_at) VALUES (?, ?, ?, ?)",
+            (
+                user["id"],
+                json.dumps(user["personal_info"]),
+                _to_db(user["created_at"]),
+                _to_db(user["updated_at"]),
+            )
+        )
+        await self.conn.commit()
+
+    async def get_user(self, user_id: str) -> Optional[Dict[str, Any]]:
+        async with self.conn.execute("SELECT * FROM users WHERE id = ?", (user_id,)) as cursor:
+            row = await cursor.fetchone()
+        if row is None:
+            return None
+        user = _from_row(row)
+        user["personal_info"] = json.loads(user["personal_info"])
+        return user
+
+    async def insert_removal_requests(self, requests: List[Dict[str, Any]]) -> None:
+        placeholders = ", ".join("?" for _ in REMOVAL_REQUEST_COLUMNS)
+        await self.conn.executemany(
+            f"INSERT INTO removal_requests ({', '.join(REMOVAL_REQUEST_COLUMNS)}) VALUES ({placeholders})",
+            [tuple(_to_db(r.get(c)) for c in REMOVAL_REQUEST_COLUMNS) for r in requests]
+        )
+        await self.conn.commit()
+
+    async def find_removal_requests(
+        self,
+        user_id: str,
+        removal_type: Optional[str] = None,
+        status: Optional[str] = None,
+        limit: int = 100,
+    ) -> List[Dict[str, Any]]:
+        sql = "SELECT * FROM removal_requests WHERE user_id = ?"
+        params: List[Any] = [user_id]
+        if removal_type is not None:
+            sql += " AND removal_type = ?"
+            params.append(removal_type)
+        if status is not None:
+            sql += " AND status = ?"
+            params.append(status)
+        sql += " LIMIT ?"
+        params.append(limit)
+        async with self.conn.execute(sql, params) as cursor:
+            return [_from_row(row) for row in await cursor.fetchall()]
+
+    async def update_removal_request(self, request_id: str, fields: Dict[str, Any]) -> bool:
+        return await self._update("id = ?", (request_id,), fields) > 0
+
+    async def update_broker_removal_request(
+        self, user_id: str, broker_name: str, fields: Dict[str, Any]
+    ) -> Optional[Dict[str, Any]]:
+        async with self.conn.execute(
+            "SELECT * FROM removal_requests WHERE user_id = ? AND broker_name = ? LIMIT 1",
+            (user_id, broker_name)
+        ) as cursor:
+            row = await cursor.fetchone()
+        if row is None:
+            return None
+        previous = _from_row(row)
+        await self._update("id = ?", (previous["id"],), fields)
+        return previous
+
+    async def update_user_removal_requests(
+        self, user_id: str, match: Dict[str, Any], fields: Dict[str, Any]
+    ) -> int:
+        return await self.update_removal_requests({"user_id": user_id, **match}, fields)
+
+    async def update_removal_requests(self, match: Dict[str, Any], fields: Dict[str, Any]) -> int:
+        where, params = _match_clause(match)
+        return await self._update(where, params, fields)
+
+    async def match_removal_requests(
+        self, match: Dict[str, Any], limit: Optional[int] = None
+    ) -> List[Dict[str, Any]]:
+        where, params = _match_clause(match)
+        sql = f"SELECT * FROM removal_requests WHERE {where}"
+        if limit is not None:
+            sql += " LIMIT ?"
+            params += (limit,)
+        async with self.conn.execute(sql, params) as cursor:
+            return [_from_row(row) for row in await cursor.fetchall()]
+
+    async def _update(self, where: str, where_params: tuple, fields: Dict[str, Any]) -> int:
+        _check_columns(fields)
+        columns = list(fields)
+        if not columns:
+            return 0
+        assignments = ", ".join(f"{c} = ?" for c in columns)
+        params = [_to_db(fields[c]) for c in columns] + list(where_params)
+        cursor = await self.conn.execute(
+            f"UPDATE removal_requests SET {assignments} WHERE {where}", params
+        )
+        await self.conn.commit()
+        return cursor.rowcount
+
+    async def removal_stats(self, user_id: str) -> Dict[str, int]:
+        async with self.conn.execute(
+            "SELECT status, COUNT(*) AS count FROM removal_requests WHERE user_id = ? GROUP BY status",
+            (user_id,)
+        ) as cursor:
+            return {row["status"]: row["count"] for row in await cursor.fetchall()}
+
+    async def iter_removal_requests(
+        self,
+        start: Optional[datetime] = None,
+        end: Optional[datetime] = None,
+        status: Optional[str] = None,
+        batch_size: int = 1000,
+    ) -> AsyncIterator[Dict[str, Any]]:
+        # Keyset pagination keeps each batch a short indexed read instead of
+        # holding a statement open on the shared connection for the whole export
+        filters = []
+        params: List[Any] = []
+        if start is not None:
+            filters.append("created_at >= ?")
+            params.append(_to_db(start))
+        if end is not None:
+            filters.append("created_at < ?")
+            params.append(_to_db(end))
+        if status is not None:
+            filters.append("status = ?")
+            params.append(status)
+
+        last = None
+        while True:
+            page_filters = list(filters)
+            page_params = list(params)
+            if last is not None:
+                page_filters.append("(created_at > ? OR (created_at = ? AND id > ?))")
+                page_params.extend([last[0], last[0], last[1]])
+            where = f"WHERE {' AND '.join(page_filters)}" if page_filters else ""
+            async with self.conn.execute(
+                f"SELECT {', '.join(REMOVAL_REQUEST_COLUMNS)} FROM removal_requests {where} "
+                "ORDER BY created_at, id LIMIT ?",
+                page_params + [batch_size]
+            ) as cursor:
+                rows = await cursor.fetchall()
+            for row in rows:
+                yield _from_row(row)
+            if len(rows) < batch_size:
+                return
+            last = (rows[-1]["created_at"], rows[-1]["id"])
+
+    async def insert_removal_transitions(self, transitions: List[Dict[str, Any]]) -> None:
+        placeholders = ", ".join("?" for _ in TRANSITION_COLUMNS)
+        await self.conn.executemany(
+            f"INSERT INTO removal_transitions ({', '.join(TRANSITION_COLUMNS)}) VALUES ({placeholders})",
+            [tuple(_to_db(t.get(c)) for c in TRANSITION_COLUMNS) for t in transitions]
+        )
+        await self.conn.commit()
+
+    async def iter_removal_transitions(
+        self, end: Optional[datetime] = None, batch_size: int = 1000
+    ) -> AsyncIterator[Dict[str, Any]]:
+        # The log is append-only, so rowid order is logging order and a stable keyset
+        last = 0
+        while True:
+            sql = f"SELECT rowid, {', '.join(TRANSITION_COLUMNS)} FROM removal_transitions WHERE rowid > ?"
+            params: List[Any] = [last]
+            if end is not None:
+                sql += " AND at < ?"
+                params.append(_to_db(end))
+            async with self.conn.execute(sql + " ORDER BY rowid LIMIT ?", params + [batch_size]) as cursor:
+                rows = await cursor.fetchall()
+            for row in rows:
+                transition = _from_row(row)
+                del transition["rowid"]
+                yield transition
+            if len(rows) < batch_size:
+                return
+            last = rows[-1]["rowid"]
+
+    async def increment_rollup(
+        self,
+        key: Dict[str, Any],
+        count: int,
+        latency_sum: float,
+        latency_histogram: Dict[int, int],
+        staging: bool = False,
+    ) -> None:
+        suffix = "_staging" if staging else ""
+        key_values = tuple(_to_db(key[field]) for field in ROLLUP_KEY_FIELDS)
+        await self.conn.execute(
+            f"INSERT INTO broker_rollups{suffix} ({', '.join(ROLLUP_KEY_FIELDS)}, count, latency_sum) "
+            "VALUES (?, ?, ?, ?, ?, ?, ?) "
+            f"ON CONFLICT ({', '.join(ROLLUP_KEY_FIELDS)}) DO UPDATE SET "
+            "count = count + excluded.count, latency_sum = latency_sum + excluded.latency_sum",
+            key_values + (count, latency_sum)
+        )
+        await self.conn.executemany(
+            f"INSERT INTO broker_rollup_latency{suffix} ({', '.join(ROLLUP_KEY_FIELDS)}, bin, count) "
+            "VALUES (?, ?, ?, ?, ?, ?, ?) "
+            f"ON CONFLICT ({', '.join(ROLLUP_KEY_FIELDS)}, bin) DO UPDATE SET "
+            "count = count + excluded.count",
+            [key_values + (latency_bin, bin_count) for latency_bin, bin_count in latency_histogram.items()]
+        )
+        await self.conn.commit()
+
+    async def find_rollups(
+        self,
+        granularity: str,
+        start: Optional[datetime] = None,
+        end: Optional[datetime] = None,
+        broker_name: Optional[str] = None,
+    ) -> List[Dict[str, Any]]:
+        filters = ["granularity = ?"]
+        params: List[Any] = [granularity]
+        if start is not None:
+            filters.append("bucket_start >= ?")
+            params.append(_to_db(start))
+        if end is not None:
+            filters.append("bucket_start < ?")
+            params.append(_to_db(end))
+        if broker_name is not None:
+            filters.append("broker_name = ?")
+            params.append(broker_name)
+        where = " AND ".join(filters)
+
+        rollups: Dict[tuple, Dict[str, Any]] = {}
+        async with self.conn.execute(
+            f"SELECT * FROM broker_rollups WHERE {where} ORDER BY bucket_start", params
+        ) as cursor:
+            for row in await cursor.fetchall():
+                rollup = _from_row(row)
+                rollup["latency_histogram"] = {}
+                rollups[tuple(row[field] for field in ROLLUP_KEY_FIELDS)] = rollup
+        async with self.conn.execute(
+            f"SELECT * FROM broker_rollup_latency WHERE {where}", params
+        ) as cursor:
+            for row in await cursor.fetchall():
+                rollup = rollups.get(tuple(row[field] for field in ROLLUP_KEY_FIELDS))
+                if rollup is not None:
+                    rollup["latency_histogram"][row["bin"]] = row["count"]
+        return list(rollups.values())
+
+    async def reset_rollup_staging(self) -> None:
+        await self.conn.executescript('''
+            BEGIN;
+            DELETE FROM broker_rollups_staging;
+            DELETE FROM broker_rollup_latency_staging;
+            COMMIT;
+        ''')
+
+    async def swap_rollup_staging(self) -> None:
+        # One script runs as a single call on the connection thread, so no
+        # other statement can land inside the transaction
+        await self.conn.executescript('''
+            BEGIN;
+            DELETE FROM broker_rollups;
+            DELETE FROM broker_rollup_latency;
+            INSERT INTO broker_rollups SELECT * FROM broker_rollups_staging;
+            INSERT INTO broker_rollup_latency SELECT * FROM broker_rollup_latency_staging;
+            DELETE FROM broker_rollups_staging;
+            DELETE FROM broker_rollup_latency_staging;
+            COMMIT;
+        ''')
+
+
+def _to_db(value: Any) -> Any:
+    """Convert a Python value into something SQLite can store"""
+    if isinstance(value, datetime):
+        return value.isoformat()
+    return value
+
+
+def _check_columns(fields: Dict[str, Any]) -> None:
+    """Reject fields that are not removal request columns, so every backend fails the same way"""
+    unknown = [c for c in fields if c not in REMOVAL_REQUEST_COLUMNS]
+    if unknown:
+        raise ValueError(f"Unknown removal request columns: {', '.join(unknown)}")
+
+
+def _match_clause(match: Dict[str, Any]) -> tuple:
+    """Build a WHERE clause and parameters from equality matches on removal request columns"""
+    _check_columns(match)
+    columns = list(match)
+    # None matches NULL, the way MongoDB matches a null or missing field
+    where = " AND ".join(f"{c} IS NULL" if match[c] is None else f"{c} = ?" for c in columns) or "1 = 1"
+    return where, tuple(_to_db(match[c]) for c in columns if match[c] is not None)
+
+
+def _from_row(row) -> Dict[str, Any]:
+    """Convert a SQLite row back into the document shape the API expects"""
+    doc = dict(row)
+    for field in DATETIME_FIELDS:
+        if doc.get(field):
+            doc[field] = datetime.fromisoformat(doc[field])
+    return doc
+
+
+def create_storage(backend: Optional[str] = None) -> Storage:
+    """Build the storage backend selected by STORAGE_BACKEND (mongo or sqlite)"""
+    backend = (backend or os.environ.get('STORAGE_BACKEND', 'mongo')).lower()
+    if backend == "sqlite":
+        return SQLiteStorage(os.environ.get('SQLITE_PATH', str(ROOT_DIR / 'dataguard.db')))
+    if backend == "mongo":
+        return MongoStorage(
+            os.environ.get('MONGO_URL', 'mongodb://localhost:27017'),
+            os.environ.get('DB_NAME', 'dataguard_pro')
+        )
+    raise ValueError(f"Unknown storage backend: {backend}")
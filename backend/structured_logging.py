@@ -0,0 +1,162 @@
+"""Structured, non-blocking logging for the API and removal workers.
+
+Log calls on the event loop only stamp the record with the current context
+(user_id, broker, request_id, attempt), decide whether it survives sampling
+and rate limiting, and push it onto an in-memory queue. A background thread
+formats the records as JSON lines and does the actual I/O.
+
+Records are keyed by their message template (or an explicit
+``extra={"event": ...}``) plus the broker in context. Repetitive INFO
+events are sampled after an initial burst, and every key is capped at a
+fixed number of records per window so one broken broker flow cannot flood
+the disk; the next record let through for a throttled key reports how many
+were dropped.
+"""
+import atexit
+import contextvars
+import json
+import logging
+import logging.handlers
+import os
+import queue
+import threading
+import time
+from contextlib import contextmanager
+from datetime import datetime, timezone
+from typing import Any, Dict, Optional
+
+CONTEXT_FIELDS = ("user_id", "broker", "request_id", "attempt")
+
+_log_context: contextvars.ContextVar[Dict[str, Any]] = contextvars.ContextVar("log_context", default={})
+
+# Attributes every LogRecord has; anything else came from ``extra=``
+_RECORD_ATTRIBUTES = set(vars(logging.LogRecord("", 0, "", 0, "", (), None))) | {"message", "asctime"}
+
+_listener: Optional[logging.handlers.QueueListener] = None
+
+
+@contextmanager
+def log_context(**fields: Any):
+    """Attach context fields to every record logged inside the block"""
+    token = _log_context.set({**_log_context.get(), **fields})
+    try:
+        yield
+    finally:
+        _log_context.reset(token)
+
+
+class ContextFilter(logging.Filter):
+    """Copy the active log context onto the record while still on the calling task"""
+
+    def filter(self, record: logging.LogRecord) -> bool:
+        for field, value in _log_context.get().items():
+            if not hasattr(record, field):
+                setattr(record, field, value)
+        return True
+
+
+class SamplingFilter(logging.Filter):
+    """Sample repetitive INFO records and rate-limit every message key per window"""
+
+    def __init__(self, window: float = 60.0, info_burst: int = 20, info_sample_every: int = 10, rate_limit: int = 100):
+        super().__init__()
+        self.window = window
+        self.info_burst = info_burst
+        self.info_sample_every = info_sample_every
+        self.rate_limit = rate_limit
+        self.counters: Dict[tuple, list] = {}
+        self.lock = threading.Lock()
+
+    def filter(self, record: logging.LogRecord) -> bool:
+        key = (getattr(record, "event", None) or str(record.msg), getattr(record, "broker", None))
+        now = time.monotonic()
+        with self.lock:
+            # [window start, seen, emitted, dropped since last emit]
+            counter = self.counters.get(key)
+            if counter is None or now - counter[0] >= self.window:
+                dropped = counter[3] if counter else 0
+                counter = [now, 0, 0, dropped]
+                self.counters[key] = counter
+                if len(self.counters) > 10000:
+                    self._prune(now)
+            counter[1] += 1
+            seen = counter[1]
+
+            if record.levelno <= logging.INFO and seen > self.info_burst and (seen - self.info_burst) % self.info_sample_every:
+                counter[3] += 1
+                return False
+            if counter[2] >= self.rate_limit and record.levelno < logging.CRITICAL:
+                counter[3] += 1
+                return False
+
+            counter[2] += 1
+            if counter[3]:
+                record.suppressed = counter[3]
+                counter[3] = 0
+        return True
+
+    def _prune(self, now: float) -> None:
+        for key in [k for k, c in self.counters.items() if now - c[0] >= self.window and not c[3]]:
+            del self.counters[key]
+
+
+class NonBlockingQueueHandler(logging.handlers.QueueHandler):
+    """Queue handler that leaves formatting to the writer thread"""
+
+    def prepare(self, record: logging.LogRecord) -> logging.LogRecord:
+        # Resolve %-style arguments now so later mutation of the args cannot
+        # change the message; tracebacks are rendered by the writer thread
+        record.msg = record.getMessage()
+        record.args = None
+        return record
+
+
+class JsonFormatter(logging.Formatter):
+    """Render records as one JSON object per line"""
+
+    def format(self, record: logging.LogRecord) -> str:
+        entry = {
+            "timestamp": datetime.fromtimestamp(record.created, timezone.utc).isoformat(),
+            "level": record.levelname,
+            "logger": record.name,
+            "message": record.getMessage(),
+        }
+        for key, value in vars(record).items():
+            if key not in _RECORD_ATTRIBUTES and not key.startswith("_"):
+                entry[key] = value
+        if record.exc_info:
+            entry["exception"] = self.formatException(record.exc_info)
+        return json.dumps(entry, default=str)
+
+
+def configure_logging() -> None:
+    """Route all logging through the queue handler and start the writer thread"""
+    global _listener
+    if _listener is not None:
+        return
+
+    if os.environ.get('LOG_FORMAT', 'json').lower() == 'json':
+        formatter = JsonFormatter()
+    else:
+        formatter = logging.Formatter('%(asctime)s - %(name)s - %(levelname)s - %(message)s')
+
+    log_file = os.environ.get('LOG_FILE')
+    output = logging.FileHandler(log_file, encoding="utf-8") if log_file else logging.StreamHandler()
+    output.setFormatter(formatter)
+
+    queue_handler = NonBlockingQueueHandler(queue.SimpleQueue())
+    queue_handler.addFilter(ContextFilter())
+    queue_handler.addFilter(SamplingFilter(
+        window=float(os.environ.get('LOG_RATE_WINDOW', '60')),
+        info_burst=int(os.environ.get('LOG_SAMPLE_BURST', '20')),
+        info_sample_every=int(os.environ.get('LOG_SAMPLE_EVERY', '10')),
+        rate_limit=int(os.environ.get('LOG_RATE_LIMIT', '100')),
+    ))
+
+    root = logging.getLogger()
+    root.handlers = [queue_handler]
+    root.setLevel(os.environ.get('LOG_LEVEL', 'INFO').upper())
+
+    _listener = logging.handlers.QueueListener(queue_handler.queue, output, respect_handler_level=True)
+    _listener.start()
+    atexit.register(_listener.stop)
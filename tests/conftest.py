@@ -0,0 +1,41 @@
+import asyncio
+import sys
+from datetime import datetime
+from pathlib import Path
+
+import pytest
+
+# Backend modules are imported the way server.py imports them
+sys.path.insert(0, str(Path(__file__).parent.parent / "backend"))
+
+
+def removal_request(request_id, status="pending", **fields):
+    """Build a removal request document; fields a test does not care about get fixed defaults"""
+    return {
+        "id": request_id,
+        "user_id": "user",
+        "broker_name": "Spokeo",
+        "removal_type": "automated",
+        "status": status,
+        "created_at": datetime(2026, 1, 1),
+        **fields,
+    }
+
+
+@pytest.fixture
+def run_with_storage(tmp_path):
+    """Return a runner that awaits ``scenario(storage)`` against a connected SQLiteStorage"""
+    from storage import SQLiteStorage
+
+    def run(scenario):
+        async def main():
+            storage = SQLiteStorage(tmp_path / "test.db")
+            await storage.connect()
+            try:
+                return await scenario(storage)
+            finally:
+                await storage.close()
+
+        return asyncio.run(main())
+
+    return run
@@ -0,0 +1,180 @@
+import asyncio
+from datetime import datetime
+
+import pytest
+
+from admission import (
+    FIRST_TIME,
+    RESCAN,
+    RETRY,
+    QueueFull,
+    RemovalQueue,
+    lane_weights_from_env,
+    recover_removals,
+)
+from tests.conftest import removal_request
+
+
+async def _noop(user_id):
+    pass
+
+
+def _fill(queue, lane, count):
+    for i in range(count):
+        queue.reserve(lane)
+        queue.submit(lane, f"{lane}-{i}")
+
+
+def test_weighted_round_robin_interleaves_lanes():
+    queue = RemovalQueue(_noop, capacity=100, weights={FIRST_TIME: 5, RETRY: 2, RESCAN: 1})
+    for lane in (FIRST_TIME, RETRY, RESCAN):
+        _fill(queue, lane, 8)
+
+    picked = [queue._next_job().rsplit("-", 1)[0] for _ in range(8)]
+
+    assert picked.count(FIRST_TIME) == 5
+    assert picked.count(RETRY) == 2
+    assert picked.count(RESCAN) == 1
+    # Smooth WRR spreads the heavy lane instead of emitting it in one burst
+    assert picked[:3] != [FIRST_TIME] * 3
+
+
+def test_empty_lanes_are_skipped():
+    queue = RemovalQueue(_noop, weights={FIRST_TIME: 5, RETRY: 2, RESCAN: 1})
+    _fill(queue, RESCAN, 3)
+
+    assert [queue._next_job() for _ in range(3)] == ["rescan-0", "rescan-1", "rescan-2"]
+
+
+def test_reserve_counts_against_capacity_until_released():
+    queue = RemovalQueue(_noop, capacity=2, retry_after=30)
+    queue.reserve(FIRST_TIME)
+    queue.reserve(FIRST_TIME)
+
+    with pytest.raises(QueueFull) as exc:
+        queue.reserve(FIRST_TIME)
+    assert exc.value.retry_after == 30
+    assert exc.value.lane == FIRST_TIME
+
+    queue.release(FIRST_TIME)
+    queue.reserve(FIRST_TIME)
+    assert queue.depth()[FIRST_TIME] == 2
+
+
+def test_lanes_have_independent_capacity():
+    queue = RemovalQueue(_noop, capacity=1)
+    _fill(queue, RESCAN, 1)
+
+    queue.reserve(FIRST_TIME)
+    with pytest.raises(QueueFull):
+        queue.reserve(RESCAN)
+
+
+def test_submit_moves_reservation_into_lane():
+    queue = RemovalQueue(_noop, capacity=5)
+    queue.reserve(RETRY)
+    queue.submit(RETRY, "user")
+
+    assert queue.reserved[RETRY] == 0
+    assert queue.depth()[RETRY] == 1
+
+
+def test_unknown_lane_is_rejected():
+    queue = RemovalQueue(_noop)
+    with pytest.raises(ValueError):
+        queue.reserve("bogus")
+
+
+def test_workers_run_jobs_and_survive_handler_errors():
+    handled = []
+
+    async def handler(user_id):
+        handled.append(user_id)
+        if user_id == "bad":
+            raise RuntimeError("boom")
+
+    async def run():
+        queue = RemovalQueue(handler, workers=1)
+        for user_id in ("bad", "good"):
+            queue.reserve(FIRST_TIME)
+            queue.submit(FIRST_TIME, user_id)
+        queue.start()
+        await asyncio.sleep(0.01)
+        await queue.stop()
+
+    asyncio.run(run())
+    assert handled == ["bad", "good"]
+
+
+def test_user_already_queued_is_not_queued_twice():
+    queue = RemovalQueue(_noop)
+    queue.reserve(FIRST_TIME)
+    assert queue.submit(FIRST_TIME, "user")
+    queue.reserve(RETRY)
+    assert not queue.submit(RETRY, "user")
+
+    assert queue.depth() == {FIRST_TIME: 1, RETRY: 0, RESCAN: 0}
+
+
+def test_running_user_gets_one_follow_up_run_instead_of_a_parallel_one():
+    handled = []
+
+    async def run():
+        release = asyncio.Event()
+
+        async def handler(user_id):
+            handled.append(user_id)
+            if len(handled) == 1:
+                await release.wait()
+
+        queue = RemovalQueue(handler, workers=2)
+        queue.requeue(FIRST_TIME, "user")
+        queue.start()
+        await asyncio.sleep(0.01)
+        # Bulk then retry while the first job is still running
+        assert not queue.requeue(RETRY, "user")
+        assert not queue.requeue(RETRY, "user")
+        await asyncio.sleep(0.01)
+        assert handled == ["user"]
+        release.set()
+        await asyncio.sleep(0.01)
+        await queue.stop()
+        return queue
+
+    queue = asyncio.run(run())
+    assert handled == ["user", "user"]
+    assert not queue.queued and not queue.running
+
+
+def test_lane_weights_from_env(monkeypatch):
+    monkeypatch.setenv("REMOVAL_LANE_WEIGHTS", "first_time=7, rescan=0")
+    assert lane_weights_from_env() == {FIRST_TIME: 7, RETRY: 2, RESCAN: 1}
+
+    monkeypatch.setenv("REMOVAL_LANE_WEIGHTS", "other=1")
+    with pytest.raises(ValueError):
+        lane_weights_from_env()
+
+
+def test_recover_removals_requeues_interrupted_work(run_with_storage):
+    async def scenario(storage):
+        await storage.insert_removal_requests([
+            removal_request("1", "in_progress", user_id="interrupted"),
+            removal_request("2", "pending", user_id="retried", queued_at=datetime(2026, 1, 2)),
+            removal_request("3", "pending", user_id="rescanned", queued_at=datetime(2026, 1, 2), rescan_of="0"),
+            removal_request("4", "completed", user_id="done"),
+            removal_request("5", "pending", user_id="manual", removal_type="manual"),
+            # A first-time request outranks the user's re-scan
+            removal_request("6", "pending", user_id="mixed", queued_at=datetime(2026, 1, 2), rescan_of="0"),
+            removal_request("7", "pending", user_id="mixed"),
+        ])
+        queue = RemovalQueue(_noop)
+        queued = await recover_removals(storage, queue)
+        return queued, queue, await storage.find_removal_requests("interrupted")
+
+    queued, queue, interrupted = run_with_storage(scenario)
+    assert queued == 4
+    assert sorted(queue.lanes[FIRST_TIME]) == ["interrupted", "mixed"]
+    assert list(queue.lanes[RETRY]) == ["retried"]
+    assert list(queue.lanes[RESCAN]) == ["rescanned"]
+    assert interrupted[0]["status"] == "pending"
+
@@ -0,0 +1,96 @@
+import asyncio
+import json
+
+from browser_state import BrowserStateCache
+
+STATE = {"cookies": [{"name": "consent", "value": "yes"}], "origins": []}
+
+
+class FakeContext:
+    def __init__(self, storage_state=None):
+        self.storage_state_arg = storage_state
+
+    async def storage_state(self):
+        return STATE
+
+
+class FakeBrowser:
+    async def new_context(self, storage_state=None):
+        return FakeContext(storage_state)
+
+
+class FakePage:
+    def __init__(self, context, banner=None):
+        self.context = context
+        self.banner = banner
+        self.clicked = []
+
+    async def is_visible(self, selector):
+        return selector == self.banner
+
+    async def click(self, selector):
+        self.clicked.append(selector)
+
+    async def wait_for_load_state(self, state):
+        pass
+
+
+def test_checkpoint_is_saved_only_after_success(tmp_path):
+    cache = BrowserStateCache(tmp_path)
+
+    async def run(success):
+        context, from_cache = await cache.open_context(FakeBrowser(), "spokeo")
+        page = FakePage(context, banner="#onetrust-accept-btn-handler")
+        await cache.checkpoint(page)
+        cache.finish(context, "spokeo", from_cache, success)
+        return from_cache, page
+
+    from_cache, page = asyncio.run(run(success=False))
+    assert from_cache is False
+    assert page.clicked == ["#onetrust-accept-btn-handler"]
+    assert cache.load("spokeo") is None
+
+    asyncio.run(run(success=True))
+    assert cache.load("spokeo") == STATE
+    assert cache.checkpoints == {}
+
+
+def test_cached_state_is_loaded_and_dropped_after_failure(tmp_path):
+    cache = BrowserStateCache(tmp_path)
+    cache.save("spokeo", STATE)
+
+    async def run():
+        context, from_cache = await cache.open_context(FakeBrowser(), "spokeo")
+        cache.finish(context, "spokeo", from_cache, success=False)
+        return context, from_cache
+
+    context, from_cache = asyncio.run(run())
+    assert from_cache is True
+    assert context.storage_state_arg == STATE
+    assert not cache.path_for("spokeo").exists()
+
+
+def test_expired_and_malformed_state_is_discarded(tmp_path):
+    cache = BrowserStateCache(tmp_path, ttl_seconds=-1)
+    cache.save("spokeo", STATE)
+    assert cache.load("spokeo") is None
+
+    cache = BrowserStateCache(tmp_path)
+    cache.path_for("spokeo").write_text(json.dumps({"saved_at": 0, "state": {"cookies": "x"}}))
+    assert cache.load("spokeo") is None
+    assert not cache.path_for("spokeo").exists()
+
+
+def test_unwritable_cache_does_not_fail_the_run(tmp_path):
+    # A file where the cache directory should be makes every save raise
+    blocked = tmp_path / "blocked"
+    blocked.write_text("")
+    cache = BrowserStateCache(blocked / "state")
+
+    async def run():
+        context, from_cache = await cache.open_context(FakeBrowser(), "spokeo")
+        await cache.checkpoint(FakePage(context))
+        cache.finish(context, "spokeo", from_cache, success=True)
+
+    asyncio.run(run())
+    assert cache.checkpoints == {}
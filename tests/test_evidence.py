@@ -0,0 +1,63 @@
+import asyncio
+import gzip
+
+from evidence import EvidenceStore, accepts_gzip, iter_decompressed
+
+HTML = "<html><script>alert(1)</script></html>"
+
+
+class FakePage:
+    def __init__(self, html):
+        self.html = html
+
+    async def screenshot(self, **kwargs):
+        return b"\xff\xd8jpeg" * 1000
+
+    async def content(self):
+        return self.html
+
+
+def test_capture_is_content_addressed_and_deduplicated(tmp_path):
+    store = EvidenceStore(tmp_path)
+
+    async def run():
+        first = await store.capture(FakePage(HTML))
+        second = await store.capture(FakePage(HTML))
+        await store.close()
+        return first, second
+
+    first, second = asyncio.run(run())
+
+    assert first == second
+    assert set(first) == {"screenshot", "html"}
+    path, media_type, encoding = store.open(first["html"])
+    assert (media_type, encoding) == ("text/html", "gzip")
+    assert gzip.decompress(path.read_bytes()) == HTML.encode()
+    assert b"".join(iter_decompressed(path)) == HTML.encode()
+    assert store.open(first["screenshot"])[1:] == ("image/jpeg", None)
+    assert len(list(tmp_path.glob("*/*"))) == 2
+
+
+def test_invalid_or_missing_ids_are_not_served(tmp_path):
+    store = EvidenceStore(tmp_path)
+
+    assert store.open("../../etc/passwd") is None
+    assert store.open("0" * 64 + ".html") is None
+
+
+def test_prune_drops_oldest_until_under_size_cap(tmp_path):
+    store = EvidenceStore(tmp_path, max_bytes=1)
+    html_id = store.put("html", HTML.encode())
+
+    store.prune()
+
+    assert store.open(html_id) is None
+
+
+def test_accepts_gzip():
+    assert accepts_gzip("gzip, deflate, br")
+    assert accepts_gzip("br;q=1.0, gzip;q=0.5")
+    assert accepts_gzip("*")
+    assert not accepts_gzip("gzip;q=0")
+    assert not accepts_gzip("identity")
+    assert not accepts_gzip(None)
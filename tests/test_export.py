@@ -0,0 +1,94 @@
+import asyncio
+import csv
+import io
+import json
+from datetime import datetime, timedelta
+
+from export import stream_export
+from storage import REMOVAL_REQUEST_COLUMNS
+from tests.conftest import removal_request
+
+START = datetime(2026, 1, 1)
+
+
+def _request(i, status="completed", **fields):
+    # Pairs share a timestamp so pagination must break ties on id
+    return removal_request(f"{i:03}", status, created_at=START + timedelta(hours=i // 2), **fields)
+
+
+def _collect(run_with_storage, requests, **filters):
+    async def scenario(storage):
+        await storage.insert_removal_requests(requests)
+        return [row async for row in storage.iter_removal_requests(**filters)]
+
+    return run_with_storage(scenario)
+
+
+async def _rows(rows):
+    for row in rows:
+        yield row
+
+
+def _chunks(rows, export_format, batch_size):
+    async def run():
+        return [chunk async for chunk in stream_export(_rows(rows), export_format, batch_size)]
+
+    return asyncio.run(run())
+
+
+def test_keyset_pagination_returns_every_row_once_in_order(run_with_storage):
+    requests = [_request(i) for i in range(11)]
+
+    rows = _collect(run_with_storage, requests, batch_size=3)
+
+    assert [row["id"] for row in rows] == [r["id"] for r in requests]
+
+
+def test_pagination_ends_on_exact_batch_boundary(run_with_storage):
+    rows = _collect(run_with_storage, [_request(i) for i in range(6)], batch_size=3)
+
+    assert len(rows) == 6
+
+
+def test_date_range_and_status_filters(run_with_storage):
+    requests = [_request(i, status="failed" if i % 2 else "completed") for i in range(12)]
+
+    rows = _collect(
+        run_with_storage,
+        requests,
+        start=START + timedelta(hours=1),
+        end=START + timedelta(hours=4),
+        status="failed",
+        batch_size=1,
+    )
+
+    # Hours 1-3 hold ids 2-7; the odd ones failed
+    assert [row["id"] for row in rows] == ["003", "005", "007"]
+
+
+def test_ndjson_yields_one_chunk_per_batch():
+    rows = [_request(i, error_message="boom") for i in range(5)]
+
+    chunks = _chunks(rows, "ndjson", batch_size=2)
+
+    assert [chunk.count("\n") for chunk in chunks] == [2, 2, 1]
+    first = json.loads(chunks[0].splitlines()[0])
+    assert first["created_at"] == "2026-01-01T00:00:00"
+    assert first["error_message"] == "boom"
+
+
+def test_csv_has_header_and_escapes_values():
+    rows = [_request(i, error_message='bad, "quoted"') for i in range(3)]
+
+    chunks = _chunks(rows, "csv", batch_size=2)
+
+    assert len(chunks) == 2
+    parsed = list(csv.DictReader(io.StringIO("".join(chunks))))
+    assert len(parsed) == 3
+    assert parsed[0]["error_message"] == 'bad, "quoted"'
+    assert parsed[2]["id"] == "002"
+
+
+def test_empty_export_still_has_csv_header():
+    assert _chunks([], "csv", batch_size=10) == [",".join(REMOVAL_REQUEST_COLUMNS) + "\r\n"]
+    assert _chunks([], "ndjson", batch_size=10) == []
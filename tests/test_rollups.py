@@ -0,0 +1,200 @@
+from datetime import datetime, timedelta
+
+import pytest
+
+import rollups
+from rollups import (
+    backfill_rollups,
+    claim_backfill,
+    classify_error,
+    histogram_percentile,
+    latency_bin,
+    query_window,
+    record_transition,
+    seed_transition_log,
+    summarize_rollups,
+)
+from tests.conftest import removal_request
+
+START = datetime(2026, 3, 1, 9, 0)
+
+
+def _request(request_id, broker="Spokeo", **fields):
+    return removal_request(request_id, broker_name=broker, created_at=START, **fields)
+
+
+async def _finish(storage, request, status, at, error_message=None):
+    """Apply a transition to storage and rollups the way server.py does"""
+    fields = {"status": status}
+    if status == "completed":
+        fields["completed_at"] = at
+    else:
+        fields.update(failed_at=at, error_message=error_message)
+    await storage.update_removal_request(request["id"], fields)
+    await record_transition(storage, request, status, error_message, at=at)
+
+
+async def _summary(storage, granularity="day"):
+    return summarize_rollups(await storage.find_rollups(granularity))
+
+
+def test_failures_add_no_latency(run_with_storage):
+    async def scenario(storage):
+        done, broken = _request("1"), _request("2")
+        await storage.insert_removal_requests([done, broken])
+        await _finish(storage, done, "completed", START + timedelta(hours=1))
+        await _finish(storage, broken, "failed", START + timedelta(hours=2), "Automated removal failed")
+        return await _summary(storage)
+
+    spokeo = run_with_storage(scenario)["Spokeo"]
+    assert spokeo["latency_seconds"]["mean"] == 3600.0
+    assert spokeo["success_rate"] == 0.5
+    assert spokeo["failure_reasons"] == {"flow_failed": 1}
+
+
+def test_backfill_reproduces_live_rollups(run_with_storage):
+    async def scenario(storage):
+        requests = [_request(str(i), broker=["Spokeo", "Intelius"][i % 2]) for i in range(6)]
+        await storage.insert_removal_requests(requests)
+        for i, request in enumerate(requests):
+            at = START + timedelta(hours=i, minutes=7 * i)
+            if i % 3:
+                await _finish(storage, request, "completed", at)
+            else:
+                await _finish(storage, request, "failed", at, "Timeout 30000ms exceeded")
+        live = {g: await _summary(storage, g) for g in ("hour", "day")}
+
+        assert claim_backfill()
+        counted = await backfill_rollups(storage, batch_size=4)
+        rebuilt = {g: await _summary(storage, g) for g in ("hour", "day")}
+        return live, rebuilt, counted
+
+    live, rebuilt, counted = run_with_storage(scenario)
+    assert counted == 6
+    assert rebuilt == live
+
+
+def test_backfill_keeps_failures_that_were_retried(run_with_storage):
+    async def scenario(storage):
+        request = _request("1")
+        await storage.insert_removal_requests([request])
+        await _finish(storage, request, "failed", START + timedelta(hours=1), "Automated removal failed")
+
+        # /removal/retry clears the failure before the request runs again
+        retry = {"status": "pending", "error_message": None, "failed_at": None,
+                 "queued_at": START + timedelta(hours=2)}
+        await storage.update_removal_request("1", retry)
+        await _finish(storage, {**request, **retry}, "completed", START + timedelta(hours=3))
+        live = await _summary(storage)
+
+        assert claim_backfill()
+        counted = await backfill_rollups(storage)
+        return live, await _summary(storage), counted
+
+    live, rebuilt, counted = run_with_storage(scenario)
+    assert (live["Spokeo"]["completed"], live["Spokeo"]["failed"]) == (1, 1)
+    assert rebuilt == live
+    assert counted == 2
+
+
+def test_transition_log_is_seeded_once_from_existing_requests(run_with_storage):
+    async def scenario(storage):
+        await storage.insert_removal_requests([
+            _request("1", status="completed", completed_at=START + timedelta(minutes=4)),
+            _request("2", status="failed", failed_at=START + timedelta(hours=1), error_message="Timeout"),
+            _request("3"),
+        ])
+        seeded = await seed_transition_log(storage, batch_size=1)
+        reseeded = await seed_transition_log(storage)
+        assert claim_backfill()
+        await backfill_rollups(storage)
+        return seeded, reseeded, await _summary(storage)
+
+    seeded, reseeded, summary = run_with_storage(scenario)
+    assert (seeded, reseeded) == (2, 0)
+    assert summary["Spokeo"]["failure_reasons"] == {"timeout": 1}
+    assert summary["Spokeo"]["latency_seconds"]["mean"] == 240.0
+
+
+def test_repeated_status_is_not_counted_twice(run_with_storage):
+    async def scenario(storage):
+        request = _request("1", removal_type="manual")
+        await storage.insert_removal_requests([request])
+        for _ in range(2):
+            previous = await storage.update_broker_removal_request(
+                "user", "Spokeo", {"status": "completed", "completed_at": START + timedelta(hours=1)}
+            )
+            await record_transition(storage, previous, "completed", at=START + timedelta(hours=1))
+        return await _summary(storage)
+
+    assert run_with_storage(scenario)["Spokeo"]["completed"] == 1
+
+
+def test_rescan_latency_is_measured_from_queue_time(run_with_storage):
+    async def scenario(storage):
+        queued_at = START + timedelta(days=30)
+        request = _request("1", queued_at=queued_at)
+        await storage.insert_removal_requests([request])
+        await _finish(storage, request, "completed", queued_at + timedelta(minutes=2))
+        return await _summary(storage)
+
+    assert run_with_storage(scenario)["Spokeo"]["latency_seconds"]["mean"] == 120.0
+
+
+def test_only_one_backfill_runs_at_a_time(run_with_storage):
+    async def scenario(storage):
+        assert claim_backfill()
+        assert not claim_backfill()
+        await backfill_rollups(storage)
+        assert claim_backfill()
+        await backfill_rollups(storage)
+
+    run_with_storage(scenario)
+
+
+def test_backfill_keeps_old_rollups_visible_and_mirrors_live_updates(run_with_storage):
+    async def scenario(storage):
+        old, late = _request("1"), _request("2")
+        await storage.insert_removal_requests([old, late])
+        await _finish(storage, old, "completed", START + timedelta(hours=1))
+
+        scan = storage.iter_removal_transitions
+        seen_during_scan = []
+
+        async def scan_with_live_traffic(**kwargs):
+            async for row in scan(**kwargs):
+                if not seen_during_scan:
+                    seen_during_scan.append(await _summary(storage))
+                    # A removal finishing mid-backfill, after the snapshot cutoff
+                    await _finish(storage, late, "completed", datetime.utcnow())
+                yield row
+
+        storage.iter_removal_transitions = scan_with_live_traffic
+        assert claim_backfill()
+        await backfill_rollups(storage)
+        return seen_during_scan, await _summary(storage)
+
+    seen_during_scan, after = run_with_storage(scenario)
+    assert seen_during_scan[0]["Spokeo"]["completed"] == 1
+    assert after["Spokeo"]["completed"] == 2
+    assert rollups._backfill_cutoff is None
+
+
+def test_query_window_defaults_to_recent_buckets_and_caps_the_range():
+    now = datetime(2026, 3, 10, 15, 30)
+
+    assert query_window("hour", end=now) == (datetime(2026, 3, 8, 15), now)
+    assert query_window("day", end=now) == (datetime(2026, 2, 8), now)
+    assert query_window("day", START, START + timedelta(days=366)) == (START, START + timedelta(days=366))
+    with pytest.raises(ValueError):
+        query_window("hour", START, START + timedelta(days=32))
+
+
+def test_helpers():
+    assert classify_error("completed", "anything") == "none"
+    assert classify_error("failed", "net::ERR_NAME_NOT_RESOLVED") == "network"
+    assert classify_error("failed", None) == "unknown"
+    assert latency_bin(1) == 0
+    assert latency_bin(5) == 2
+    assert histogram_percentile({}, 0.5) is None
+    assert histogram_percentile({0: 1, 10: 9}, 0.9) == round(2 ** 10 * 2 ** 0.5, 1)
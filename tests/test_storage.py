@@ -0,0 +1,34 @@
+from datetime import datetime
+
+import pytest
+
+from tests.conftest import removal_request
+
+
+def test_none_matches_unset_fields(run_with_storage):
+    async def scenario(storage):
+        await storage.insert_removal_requests([
+            removal_request("1", "completed"),
+            removal_request("2", "completed", rescanned_at=datetime(2026, 1, 2)),
+        ])
+        match = {"status": "completed", "rescanned_at": None}
+        unscanned = await storage.match_removal_requests(match)
+        claimed = await storage.update_removal_requests(match, {"rescanned_at": datetime(2026, 1, 3)})
+        return unscanned, claimed, await storage.update_removal_requests(match, {"rescanned_at": None})
+
+    unscanned, claimed, claimed_again = run_with_storage(scenario)
+    assert [r["id"] for r in unscanned] == ["1"]
+    assert (claimed, claimed_again) == (1, 0)
+
+
+def test_unknown_columns_are_rejected_instead_of_ignored(run_with_storage):
+    async def scenario(storage):
+        await storage.insert_removal_requests([removal_request("1")])
+        for match, fields in (({"statuz": "x"}, {"status": "failed"}), ({"status": "pending"}, {"statuz": "x"})):
+            with pytest.raises(ValueError):
+                await storage.update_removal_requests(match, fields)
+        with pytest.raises(ValueError):
+            await storage.match_removal_requests({"statuz": "x"})
+        return await storage.find_removal_requests("user")
+
+    assert run_with_storage(scenario)[0]["status"] == "pending"
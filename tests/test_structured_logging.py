@@ -0,0 +1,103 @@
+import json
+import logging
+import queue
+
+from structured_logging import (
+    ContextFilter,
+    JsonFormatter,
+    NonBlockingQueueHandler,
+    SamplingFilter,
+    log_context,
+)
+
+
+def _record(msg="Removal request completed", level=logging.INFO, args=(), **extra):
+    record = logging.LogRecord("test", level, __file__, 1, msg, args, None)
+    for key, value in extra.items():
+        setattr(record, key, value)
+    return record
+
+
+def _passed(log_filter, records):
+    return [r for r in records if log_filter.filter(r)]
+
+
+def test_info_events_are_sampled_after_burst():
+    log_filter = SamplingFilter(info_burst=3, info_sample_every=4, rate_limit=1000)
+
+    passed = _passed(log_filter, [_record() for _ in range(15)])
+
+    # 3 burst records, then every 4th of the remaining 12
+    assert len(passed) == 3 + 3
+    assert passed[3].suppressed == 3
+
+
+def test_errors_are_not_sampled_but_are_rate_limited():
+    log_filter = SamplingFilter(info_burst=1, info_sample_every=100, rate_limit=5)
+    records = [_record("Spokeo removal error: %s", logging.ERROR, ("boom",)) for _ in range(9)]
+
+    assert len(_passed(log_filter, records)) == 5
+
+
+def test_critical_bypasses_rate_limit():
+    log_filter = SamplingFilter(rate_limit=1)
+    records = [_record("fatal", logging.CRITICAL) for _ in range(3)]
+
+    assert len(_passed(log_filter, records)) == 3
+
+
+def test_keys_are_per_template_event_and_broker():
+    log_filter = SamplingFilter(rate_limit=2, info_burst=100)
+    records = (
+        [_record(broker="spokeo") for _ in range(3)]
+        + [_record(broker="intelius") for _ in range(3)]
+        + [_record(event="other", broker="spokeo") for _ in range(3)]
+    )
+
+    assert len(_passed(log_filter, records)) == 6
+
+
+def test_window_reset_reports_dropped_records(monkeypatch):
+    now = [0.0]
+    monkeypatch.setattr("structured_logging.time.monotonic", lambda: now[0])
+    log_filter = SamplingFilter(window=60, rate_limit=1, info_burst=100)
+
+    assert len(_passed(log_filter, [_record() for _ in range(4)])) == 1
+
+    now[0] = 61.0
+    record = _record()
+    assert log_filter.filter(record)
+    assert record.suppressed == 3
+
+
+def test_context_fields_are_attached_and_scoped():
+    context_filter = ContextFilter()
+
+    with log_context(user_id="u1", broker="spokeo"):
+        with log_context(request_id="r1", attempt=2):
+            inner = _record()
+            context_filter.filter(inner)
+        outer = _record(user_id="explicit")
+        context_filter.filter(outer)
+    after = _record()
+    context_filter.filter(after)
+
+    assert (inner.user_id, inner.broker, inner.request_id, inner.attempt) == ("u1", "spokeo", "r1", 2)
+    assert outer.user_id == "explicit"
+    assert not hasattr(outer, "request_id")
+    assert not hasattr(after, "user_id")
+
+
+def test_queue_handler_resolves_args_and_json_includes_extras():
+    handler = NonBlockingQueueHandler(queue.SimpleQueue())
+    handler.handle(_record("Created %d removal requests", args=(8,), user_id="u1", event="created"))
+    record = handler.queue.get_nowait()
+
+    assert record.msg == "Created 8 removal requests"
+    assert record.args is None
+
+    entry = json.loads(JsonFormatter().format(record))
+    assert entry["message"] == "Created 8 removal requests"
+    assert entry["level"] == "INFO"
+    assert entry["user_id"] == "u1"
+    assert entry["event"] == "created"